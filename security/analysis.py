@@ -0,0 +1,104 @@
+# Per camera analysis of ringring.py: the zones, the detector and what we
+# remember between frames.  It is its own module so the analysis worker
+# processes (workers.py) can use it without the display side of ringring.py.
+import time
+
+from detectors import make_detector
+from thresholds import AdaptiveThreshold
+from zones import CompiledZones, Roi, Zone
+
+# The frame counter goes back to 0 here, it only picks the frames whose scores
+# get printed and must not grow for weeks
+COUNTER_WRAP = 3000
+# Zones watched on cameras that are not in the --zones file
+DEFAULT_ZONES = [
+    Zone("Timbre", Roi(500, 230, 600, 500)),
+    Zone("Calle", Roi(200, 230, 400, 500)),
+]
+
+
+class CameraState:
+    """What the analysis loop remembers about each camera between frames."""
+
+    def __init__(self, name, zones=DEFAULT_ZONES, downscale=2, main_size=None, detector="diff",
+                 adaptive=True, report_every=30):
+        self.name = name
+        self.zones = zones
+        self.detector_name = detector
+        self.downscale = downscale
+        # Size of the frames the zones were written for, None if it is the
+        # same stream we analyze
+        self.main_size = main_size
+        # Compiled on the first frame, once we know the size of the stream
+        self.compiled = None
+        self.detector = None
+        self.results = {zone.name: 0 for zone in zones}
+        # With adaptive the zone threshold is only the floor of a cutoff that
+        # follows the noise of the zone, see thresholds.py
+        self.thresholds = None
+        if adaptive:
+            self.thresholds = {zone.name: AdaptiveThreshold(zone.threshold) for zone in zones}
+        self.moving = {zone.name: False for zone in zones}
+        # Frames between the printed scores, 0 doesn't print them
+        self.report_every = report_every
+        self.counter = 0
+        # Seconds from the read of a frame to the "Motion Detected!!" overlay
+        self.latency = 0.0
+        self.latency_max = 0.0
+        # Seconds of each stage of the last frame analyzed, see metrics.py
+        self.timings = {}
+
+    def motion(self):
+        """True if any zone is in motion."""
+        return any(self.moving.values())
+
+    def cutoff(self, zone):
+        """The score zone is in motion over right now."""
+        if self.thresholds is None:
+            return zone.threshold
+        return self.thresholds[zone.name].cutoff()
+
+    def update(self, results, decoded_at):
+        """Keeps the scores of a frame, which zones they put in motion and how
+        late they came."""
+        self.results = results
+        for zone in self.zones:
+            score = results[zone.name]
+            if self.thresholds is None:
+                self.moving[zone.name] = score > zone.threshold
+            else:
+                self.moving[zone.name] = self.thresholds[zone.name].update(score)
+        if self.motion():
+            self.latency = time.monotonic() - decoded_at
+            self.latency_max = max(self.latency_max, self.latency)
+
+
+def analyze(state, frame1, decoded_at, still_valid=None):
+    """Scores all the zones of one frame of a camera, this is all that runs in
+    headless mode.  Returns the gray area covering the zones.
+    still_valid is for frames someone else may overwrite (workers.py): the
+    area of the zones is copied, and if still_valid() is then False the frame
+    is dropped before the detector or the thresholds see it, returns None."""
+    if state.compiled is None:
+        state.compiled = CompiledZones(state.zones, frame1.shape, state.main_size, state.downscale)
+        state.detector = make_detector(state.detector_name, state.compiled)
+    # Crop first and convert only the area of the zones to Gray Scale
+    start = time.perf_counter()
+    crop = state.compiled.crop(frame1, copy=still_valid is not None)
+    cropped = time.perf_counter()
+    if still_valid is not None and not still_valid():
+        return None
+    crop_img = state.compiled.convert(crop)
+    converted = time.perf_counter()
+    results = state.detector.score(crop_img)
+    scored = time.perf_counter()
+    state.timings = {"crop": cropped - start, "cvtColor": converted - cropped,
+                     "score": scored - converted}
+    state.update(results, decoded_at)
+
+    state.counter = (state.counter + 1) % COUNTER_WRAP
+    if state.report_every and (state.counter % state.report_every) == 0:
+        for zone in state.zones:
+            print(f"{state.name} {zone.name} Counter {state.counter} and {state.results[zone.name]}"
+                  f" cutoff {state.cutoff(zone):.2f}")
+    return crop_img
@@ -0,0 +1,205 @@
+# What is normal motion for each camera at each hour of the week, learned from
+# the score history (scorelog.py), to flag what is not: someone at the door at
+# 3am is unusual, the same scores at 6pm are not.
+# The activity of a zone in a minute is its mean score (from the pyramids of
+# pyramid.py, so building goes through the history a day of minute summaries
+# at a time and only reads the raw scores the pyramids haven't seen yet).
+# Every camera gets, per zone and per hour of the week (Monday 00:00 is 0,
+# local time), a histogram of those minute activities on fixed log spaced
+# bins, so memory is the same for a week or for a year of history.  From the
+# histograms come the quantile tables saved with them, so scoring new minutes
+# is looking up the quantile of their hour of the week, no refit.
+#
+#   python motioncam1.py scores/ --camera cam1 --build-baseline --start 2024-03-01 --end 2024-05-01
+#   python motioncam1.py scores/ --camera cam1 --anomalies --start 2024-05-01
+import os
+from datetime import datetime
+
+import numpy as np
+
+from pyramid import MINUTE, Pyramid
+from scorelog import camera_folder, day_start, days_between
+
+SLOTS = 7 * 24
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+# Bin edges of the minute activities, 0 has a bin of its own
+EDGES = np.concatenate(([0.0], np.logspace(-4, 3, 141)))
+# Hours of the week with fewer minutes than this have no quantiles
+MIN_MINUTES = 30
+
+
+def baseline_path(directory, camera):
+    return os.path.join(directory, "baseline", camera + ".npz")
+
+
+def day_slots(day):
+    """Hour of the week of every hour since the midnight of day (25, the
+    day the clocks go back has them)."""
+    midnight = day_start(day)
+    slots = []
+    for hour in range(25):
+        when = datetime.fromtimestamp(midnight + hour * 3600)
+        slots.append(when.weekday() * 24 + when.hour)
+    return np.array(slots)
+
+
+def minute_activity(directory, camera, day, zones=None):
+    """Yields (zone, unix times, hour of the week, mean score) of the minutes of
+    camera on day that have scores."""
+    if not os.path.isdir(camera_folder(directory, day, camera)):
+        return
+    pyramid = Pyramid(directory, camera, day).update()
+    midnight = day_start(day)
+    slots = day_slots(day)
+    for zone in zones if zones is not None else sorted(pyramid.zones):
+        offsets, low, high, mean = pyramid.level(zone, MINUTE)
+        yield zone, midnight + offsets, slots[offsets.astype(np.int64) // 3600], mean
+
+
+class Baseline:
+    """Histograms of the minute activity of the zones of a camera per hour of
+    the week, and their quantile tables."""
+
+    def __init__(self, camera, start=None, end=None):
+        self.camera = camera
+        # Unix times of the history it was built from
+        self.start = start
+        self.end = end
+        # {zone: SLOTS x bins counts}
+        self.histograms = {}
+        # {zone: SLOTS x QUANTILES}, NaN where the hour had too few minutes
+        self.tables = {}
+
+    def add(self, zone, slots, values):
+        histogram = self.histograms.get(zone)
+        if histogram is None:
+            histogram = self.histograms[zone] = np.zeros((SLOTS, len(EDGES) - 1), dtype=np.int64)
+        np.add.at(histogram, (slots, self.bins(values)), 1)
+        self.tables.pop(zone, None)
+
+    @staticmethod
+    def bins(values):
+        return np.clip(np.searchsorted(EDGES, values, side="right") - 1, 0, len(EDGES) - 2)
+
+    def table(self, zone):
+        """The quantiles of every hour of the week of zone, the upper edge of
+        the bin where the cumulative count reaches each of QUANTILES."""
+        table = self.tables.get(zone)
+        if table is None:
+            histogram = self.histograms[zone]
+            totals = histogram.sum(axis=1)
+            cumulative = np.cumsum(histogram, axis=1) / np.maximum(totals, 1)[:, None]
+            table = np.empty((SLOTS, len(QUANTILES)))
+            for i, quantile in enumerate(QUANTILES):
+                # First bin whose cumulative count gets to the quantile
+                first = (cumulative < quantile - 1e-12).sum(axis=1)
+                table[:, i] = EDGES[np.minimum(first + 1, len(EDGES) - 1)]
+            table[totals < MIN_MINUTES] = np.nan
+            self.tables[zone] = table
+        return table
+
+    def expected(self, zone, slots, quantile):
+        """Activity at quantile (one of QUANTILES) of the hours of the week
+        slots, NaN if the zone or the hour has no history."""
+        if zone not in self.histograms:
+            return np.full(len(slots), np.nan)
+        return self.table(zone)[slots, QUANTILES.index(quantile)]
+
+    def rank(self, zone, slots, values):
+        """Fraction of the minutes of history of each hour of the week that
+        were less active than values."""
+        if zone not in self.histograms:
+            return np.full(len(slots), np.nan)
+        histogram = self.histograms[zone][slots]
+        totals = histogram.sum(axis=1)
+        bins = self.bins(values)
+        below = np.where(np.arange(histogram.shape[1]) < bins[:, None], histogram, 0).sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(totals > 0, below / totals, np.nan)
+
+    def minutes(self, zone):
+        """Minutes of history of every hour of the week of zone."""
+        return self.histograms[zone].sum(axis=1)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        arrays = {"camera": np.array(self.camera), "start": np.array(self.start),
+                  "end": np.array(self.end), "edges": EDGES, "quantiles": np.array(QUANTILES)}
+        for zone in self.histograms:
+            arrays[f"{zone}.histogram"] = self.histograms[zone]
+            arrays[f"{zone}.table"] = self.table(zone)
+        temporary = path + ".tmp.npz"
+        np.savez(temporary, **arrays)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as saved:
+            if not np.array_equal(saved["edges"], EDGES) or \
+                    tuple(saved["quantiles"]) != QUANTILES:
+                raise ValueError(f"{path} was built with other bins or quantiles, build it again")
+            baseline = cls(str(saved["camera"]), float(saved["start"]), float(saved["end"]))
+            for key in saved.files:
+                if key.endswith(".histogram"):
+                    zone = key[:-len(".histogram")]
+                    baseline.histograms[zone] = saved[key]
+                    baseline.tables[zone] = saved[zone + ".table"]
+        return baseline
+
+
+def build_baseline(directory, camera, start, end, zones=None):
+    """Baseline of camera from its scores between the unix times start and
+    end."""
+    baseline = Baseline(camera, start, end)
+    for day in days_between(start, end):
+        for zone, at, slots, mean in minute_activity(directory, camera, day, zones):
+            keep = (at >= start) & (at < end)
+            baseline.add(zone, slots[keep], mean[keep])
+    return baseline
+
+
+class Anomaly:
+    """Minutes in a row of a zone more active than the baseline expects."""
+
+    def __init__(self, camera, zone, start, end, peak, expected, rank):
+        self.camera = camera
+        self.zone = zone
+        self.start = start
+        self.end = end
+        self.peak = peak
+        self.expected = expected
+        self.rank = rank
+
+    def describe(self):
+        return (f"{datetime.fromtimestamp(self.start):%Y-%m-%d %a %H:%M}"
+                f"-{datetime.fromtimestamp(self.end):%H:%M} {self.camera} {self.zone}"
+                f" activity {self.peak:.3f} expected under {self.expected:.3f}"
+                f" (more than {self.rank:.1%} of that hour)")
+
+
+def find_anomalies(baseline, directory, camera, start, end, quantile=0.99, floor=0.0,
+                   zones=None):
+    """Runs of minutes between the unix times start and end whose activity
+    is over the quantile of their hour of the week and over floor.  Hours
+    with no history never flag."""
+    found = []
+    for day in days_between(start, end):
+        for zone, at, slots, mean in minute_activity(directory, camera, day, zones):
+            keep = (at >= start) & (at < end)
+            at, slots, mean = at[keep], slots[keep], mean[keep]
+            expected = baseline.expected(zone, slots, quantile)
+            with np.errstate(invalid="ignore"):
+                flagged = np.flatnonzero((mean > expected) & (mean > floor))
+            if not len(flagged):
+                continue
+            ranks = baseline.rank(zone, slots[flagged], mean[flagged])
+            # Runs of minutes that follow each other
+            breaks = np.flatnonzero(np.diff(at[flagged]) > MINUTE) + 1
+            for run in np.split(np.arange(len(flagged)), breaks):
+                rows = flagged[run]
+                top = run[np.argmax(mean[rows])]
+                found.append(Anomaly(camera, zone, float(at[rows[0]]),
+                                     float(at[rows[-1]] + MINUTE), float(mean[flagged[top]]),
+                                     float(expected[flagged[top]]), float(ranks[top])))
+    found.sort(key=lambda anomaly: anomaly.start)
+    return found
@@ -0,0 +1,82 @@
+# Compares the motion detectors of detectors.py on recorded clips.
+# The clips are decoded once into memory and then every detector runs over the
+# same frames as fast as it can, so the frames/second only count the work of
+# ringring.py's analysis (crop, gray conversion and scoring), not the decode.
+#
+#   python benchdetectors.py clip1.mp4 clip2.mp4 --zones zones.json --camera cam1
+import argparse
+import time
+
+import cv2
+
+from analysis import DEFAULT_ZONES
+from detectors import DETECTORS, make_detector
+from zones import CompiledZones, load_zones
+
+
+def read_clip(path, max_frames):
+    frames = []
+    cap = cv2.VideoCapture(path)
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def run(detector_name, frames, zones, downscale):
+    """Returns (frames/second, frames in motion, alarms).  An alarm is a
+    zone going from still to motion."""
+    compiled = CompiledZones(zones, frames[0].shape, downscale=downscale)
+    detector = make_detector(detector_name, compiled)
+    in_motion = {zone.name: False for zone in zones}
+    motion_frames = 0
+    alarms = 0
+    start = time.perf_counter()
+    for frame in frames:
+        results = detector.score(compiled.gray(frame))
+        any_motion = False
+        for zone in zones:
+            motion = results[zone.name] > zone.threshold
+            if motion and not in_motion[zone.name]:
+                alarms += 1
+            in_motion[zone.name] = motion
+            any_motion = any_motion or motion
+        motion_frames += any_motion
+    elapsed = time.perf_counter() - start
+    return len(frames) / elapsed, motion_frames, alarms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frames/second and alarms of every detector")
+    parser.add_argument("clips", nargs="+", help="recorded video files")
+    parser.add_argument("--zones", metavar="FILE", help="zones file, see zones.example.json")
+    parser.add_argument("--camera", help="camera of the zones file the clips come from"
+                                         " (default: the first one)")
+    parser.add_argument("--detector", action="append", choices=DETECTORS,
+                        help="detector to run, can be repeated (default: all)")
+    parser.add_argument("--downscale", type=int, default=2)
+    parser.add_argument("--max-frames", type=int, default=3000,
+                        help="frames read from each clip (default: 3000)")
+    args = parser.parse_args()
+
+    zones = DEFAULT_ZONES
+    if args.zones:
+        config = load_zones(args.zones)
+        zones = config[args.camera or next(iter(config))]["zones"]
+
+    print(f"{'clip':30} {'detector':8} {'fps':>8} {'motion':>7} {'alarms':>7}")
+    for clip in args.clips:
+        frames = read_clip(clip, args.max_frames)
+        if not frames:
+            print(f"Can't read frames from {clip}")
+            continue
+        for name in args.detector or DETECTORS:
+            fps, motion_frames, alarms = run(name, frames, zones, args.downscale)
+            print(f"{clip[-30:]:30} {name:8} {fps:8.1f} {motion_frames:7} {alarms:7}")
+
+
+if __name__ == '__main__':
+    main()
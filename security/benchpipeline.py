@@ -0,0 +1,149 @@
+# Runs the whole pipeline of ringring.py over a recorded clip or a synthetic
+# video, in one thread and as fast as it goes, and says where the time goes
+# and how good the detections are.
+# Every frame is timed in its four stages: decode (grab + retrieve), convert
+# (crop and gray conversion of the zones), score (the detector) and draw (the
+# overlays, on a copy).  The frames a detector finds in motion are compared
+# with a ground truth file (see replay.py), a synthetic video knows its own.
+#
+#   python benchpipeline.py synthetic://?seconds=120 --detector diff --detector mog2
+#   python benchpipeline.py clip.mp4 --truth clip.csv --zones zones.json --camera cam1
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from analysis import DEFAULT_ZONES, CameraState
+from detectors import DETECTORS, make_detector
+from replay import SyntheticCapture, load_truth, write_truth
+from ringring import draw
+from zones import CompiledZones, load_zones
+
+STAGES = ("decode", "convert", "score", "draw")
+
+
+def open_source(source):
+    if source.startswith("synthetic:"):
+        return SyntheticCapture.from_url(source)
+    return cv2.VideoCapture(source)
+
+
+def run(source, detector_name, zones, downscale, max_frames, adaptive=True):
+    """Returns (fps, {stage: [seconds per frame]}, [motion of each frame],
+    video fps)."""
+    cap = open_source(source)
+    if not cap.isOpened():
+        raise SystemExit(f"Can't open {source}")
+    video_fps = cap.get(cv2.CAP_PROP_FPS) or 25
+    state = CameraState("bench", zones, downscale, detector=detector_name, adaptive=adaptive)
+    times = {stage: [] for stage in STAGES}
+    motion = []
+    frame = None
+    start = time.perf_counter()
+    while len(motion) < max_frames:
+        t0 = time.perf_counter()
+        if not cap.grab():
+            break
+        ret, frame = cap.retrieve(frame)
+        if not ret:
+            break
+        t1 = time.perf_counter()
+        if state.compiled is None:
+            state.compiled = CompiledZones(zones, frame.shape, downscale=downscale)
+            state.detector = make_detector(detector_name, state.compiled)
+        gray = state.compiled.gray(frame)
+        t2 = time.perf_counter()
+        state.update(state.detector.score(gray), time.monotonic())
+        t3 = time.perf_counter()
+        draw(state, frame.copy())
+        t4 = time.perf_counter()
+        for stage, seconds in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+            times[stage].append(seconds)
+        motion.append(state.motion())
+    elapsed = time.perf_counter() - start
+    cap.release()
+    return len(motion) / elapsed, times, motion, video_fps
+
+
+def truth_frames(intervals, frames, fps):
+    """Which frames are inside a ground truth interval."""
+    truth = np.zeros(frames, dtype=bool)
+    for start, end in intervals:
+        truth[int(np.ceil(start * fps)):int(np.ceil(end * fps))] = True
+    return truth
+
+
+def runs(flags):
+    """(first, last + 1) frame of every run of True."""
+    edges = np.diff(np.concatenate(([0], flags.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+def compare(motion, truth):
+    """Returns (truth events detected, truth events, false alarms, frame
+    precision, frame recall).  A truth event is detected when a frame of it is
+    in motion, a run of motion frames that touches no truth event is a false
+    alarm."""
+    motion = np.asarray(motion, dtype=bool)
+    truth_runs = runs(truth)
+    detected = sum(motion[start:end].any() for start, end in truth_runs)
+    false_alarms = sum(not truth[start:end].any() for start, end in runs(motion))
+    hits = np.count_nonzero(motion & truth)
+    precision = hits / max(np.count_nonzero(motion), 1)
+    recall = hits / max(np.count_nonzero(truth), 1)
+    return detected, len(truth_runs), false_alarms, precision, recall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and accuracy of every stage of ringring.py")
+    parser.add_argument("source", help="recorded video file or synthetic://?seconds=60&period=10...")
+    parser.add_argument("--truth", metavar="FILE",
+                        help="ground truth of the video, start,end seconds with motion per line")
+    parser.add_argument("--write-truth", metavar="FILE",
+                        help="save the ground truth of a synthetic video")
+    parser.add_argument("--zones", metavar="FILE", help="zones file, see zones.example.json")
+    parser.add_argument("--camera", help="camera of the zones file the video comes from"
+                                         " (default: the first one)")
+    parser.add_argument("--detector", action="append", choices=DETECTORS,
+                        help="detector to run, can be repeated (default: diff)")
+    parser.add_argument("--downscale", type=int, default=2)
+    parser.add_argument("--threshold", choices=("adaptive", "fixed"), default="adaptive",
+                        help="motion cutoff of the zones, see ringring.py (default: adaptive)")
+    parser.add_argument("--max-frames", type=int, default=100000)
+    args = parser.parse_args()
+
+    zones = DEFAULT_ZONES
+    if args.zones:
+        config = load_zones(args.zones)
+        zones = config[args.camera or next(iter(config))]["zones"]
+
+    intervals = None
+    if args.truth:
+        intervals = load_truth(args.truth)
+    elif args.source.startswith("synthetic:"):
+        intervals = SyntheticCapture.from_url(args.source).truth(zones)
+    if args.write_truth and intervals is not None:
+        write_truth(args.write_truth, intervals)
+
+    header = f"{'detector':8} {'fps':>7}" + "".join(f" {stage + ' ms':>16}" for stage in STAGES)
+    if intervals is not None:
+        header += f" {'events':>8} {'false':>6} {'prec':>5} {'recall':>6}"
+    print(header)
+    print(f"{'':16}" + "".join(f" {'mean':>8}{'p95':>8}" for _ in STAGES))
+    for name in args.detector or ["diff"]:
+        fps, times, motion, video_fps = run(args.source, name, zones, args.downscale,
+                                            args.max_frames, args.threshold == "adaptive")
+        line = f"{name:8} {fps:7.1f}"
+        for stage in STAGES:
+            ms = np.array(times[stage]) * 1000
+            line += f" {ms.mean():8.2f}{np.percentile(ms, 95):8.2f}"
+        if intervals is not None:
+            truth = truth_frames(intervals, len(motion), video_fps)
+            detected, events, false_alarms, precision, recall = compare(motion, truth)
+            line += f" {detected:>3}/{events:<4} {false_alarms:6} {precision:5.2f} {recall:6.2f}"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,398 @@
+# Capture engine for ringring.py
+# Every camera gets its own thread doing nothing but cap.read(), so a slow
+# stream (or a slow analysis loop) never holds the other cameras back.
+# A camera that fails or stalls is reconnected in its own thread, with a
+# growing wait between attempts, the others keep going meanwhile.
+#
+# With decode_every > 1 only every Nth frame is retrieved: cap.grab() still
+# has to decode the compressed stream (the next frames depend on it) but the
+# conversion to BGR and the copy out of FFmpeg only happen for the frames we
+# use.  The FFmpeg options of the RTSP streams come from the environment
+# variable OPENCV_FFMPEG_CAPTURE_OPTIONS, DEFAULT_FFMPEG_OPTIONS if unset.
+# Frames go into a small buffer where the newest frame always wins: if the
+# analysis loop is busy the old frames are simply overwritten.
+#
+# Reader modes:
+#   latest - the analysis loop only ever gets the newest decoded frame, the
+#            rest are dropped so alerts never lag behind the live stream.
+#   all    - every frame still in the buffer is handed over in order, only
+#            the ones pushed out of the (bounded) buffer are dropped.
+import collections
+import os
+import threading
+import time
+
+import cv2
+
+from framepool import SharedFrames
+from replay import PacedCapture, open_replay
+
+# key;value pairs separated by |, read by OpenCV when a stream is opened:
+# TCP is steadier than UDP over Wi-Fi and the flags stop FFmpeg from
+# buffering frames before handing them over
+DEFAULT_FFMPEG_OPTIONS = "rtsp_transport;tcp|fflags;nobuffer|flags;low_delay"
+
+
+NETWORK_SCHEMES = ("rtsp://", "rtsps://", "rtmp://", "http://", "https://", "udp://", "tcp://")
+
+
+def set_ffmpeg_options(options=None):
+    """Sets the FFmpeg capture options, for the streams opened after this.
+    Without options it keeps the environment's or uses the default ones."""
+    if options is not None:
+        os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = options
+    else:
+        os.environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS", DEFAULT_FFMPEG_OPTIONS)
+
+
+class FrameBuffer:
+    """Bounded buffer of decoded frames, the newest frame always wins."""
+
+    def __init__(self, size=1, new_frame=None):
+        self.frames = collections.deque(maxlen=size)
+        self.lock = threading.Lock()
+        # Condition shared by all the cameras of an engine, notified on every put
+        self.new_frame = new_frame if new_frame is not None else threading.Condition()
+        self.seq = 0
+
+    def put(self, frame, decoded_at):
+        with self.new_frame:
+            with self.lock:
+                self.seq += 1
+                self.frames.append((self.seq, decoded_at, frame))
+            self.new_frame.notify_all()
+
+    def since(self, seq, latest=True):
+        """Returns the (seq, decoded_at, frame) entries newer than seq, only
+        the newest one when latest is True."""
+        with self.lock:
+            if not self.frames or self.frames[-1][0] <= seq:
+                return []
+            if latest:
+                return [self.frames[-1]]
+            return [entry for entry in self.frames if entry[0] > seq]
+
+
+class Camera:
+    """Reads one RTSP stream in its own thread and keeps the newest frames.
+    With slots > 0 the frames are decoded into a framepool.SharedFrames pool
+    instead of a new array every time.
+
+    Network streams are reopened when they fail, waiting min_backoff seconds
+    and doubling up to max_backoff while the camera stays down (or drops the
+    stream before sending a frame), the first frame resets it.  A reader
+    stuck inside cap.read() can't be interrupted, restart() leaves it behind
+    and starts a new one (see Supervisor).  Files and replays (replay.py)
+    just end, with realtime they go at the pace of the video."""
+
+    def __init__(self, name, url, buffer_size=1, new_frame=None, slots=0,
+                 reconnect=None, min_backoff=1, max_backoff=60, timeout=10,
+                 decode_every=1, capture_buffer=None, realtime=False, metrics=None):
+        self.name = name
+        self.url = url
+        self.buffer = FrameBuffer(buffer_size, new_frame)
+        if reconnect is None:
+            reconnect = url.lower().startswith(NETWORK_SCHEMES)
+        self.reconnect = reconnect
+        self.realtime = realtime
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        # Seconds OpenCV waits to open the stream or for a frame
+        self.timeout = timeout
+        self.decode_every = decode_every
+        # Frames OpenCV may queue inside the capture, None leaves the default
+        self.capture_buffer = capture_buffer
+        # Decode cost: seconds spent in grab() and retrieve()
+        self.grabbed = 0
+        self.grab_time = 0.0
+        self.retrieve_time = 0.0
+        # metrics.Metrics that gets the read time of every decoded frame
+        self.metrics = metrics
+        self.thread = None
+        # Every restart() bumps it, older readers see it and quit
+        self.generation = 0
+        self.stopping = threading.Event()
+        self.failed = False
+        # Counters: decoded is self.buffer.seq, the rest are kept by the engine
+        self.analyzed = 0
+        self.dropped = 0
+        # Health: connected_at is None while the stream is down
+        self.started_at = None
+        self.connected_at = None
+        self.last_frame_at = None
+        self.reconnects = 0
+        # Called with (frame, decoded_at, slot, seq) for every decoded frame,
+        # in this thread, so they must be quick (the recorder just keeps the
+        # frame).  slot is None when the frame is not in self.frames
+        self.listeners = []
+        self.slots = slots
+        self.frames = None
+        # Frames read into a new array because every slot was taken
+        self.pool_misses = 0
+
+    def open(self):
+        """Returns an opened cv2.VideoCapture (or replay) or None."""
+        cap = open_replay(self.url, self.realtime)
+        if cap is not None:
+            return cap
+        params = [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(self.timeout * 1000),
+                  cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(self.timeout * 1000)]
+        if self.capture_buffer is not None:
+            params += [cv2.CAP_PROP_BUFFERSIZE, self.capture_buffer]
+        cap = cv2.VideoCapture(self.url, cv2.CAP_ANY, params)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        if self.realtime and not self.reconnect:
+            cap = PacedCapture(cap)
+        return cap
+
+    def read(self, cap):
+        """Returns (ret, frame, slot), retrieving into a free slot of the pool
+        when there is one.  frame is None for the frames decode_every skips."""
+        if isinstance(cap, PacedCapture):
+            cap.pace()
+        start = time.perf_counter()
+        ret = cap.grab()
+        retrieve_start = time.perf_counter()
+        self.grab_time += retrieve_start - start
+        self.grabbed += 1
+        if not ret or self.grabbed % self.decode_every:
+            return ret, None, None
+        try:
+            if self.slots and self.frames is not None:
+                slot = self.frames.acquire()
+                if slot is not None:
+                    view = self.frames.views[slot]
+                    ret, frame = cap.retrieve(image=view)
+                    if not ret or frame is view:
+                        return ret, frame, slot
+                    # OpenCV allocated a new array, the stream changed its size
+                    self.new_pool(frame.shape)
+                    return ret, frame, None
+                self.pool_misses += 1
+            ret, frame = cap.retrieve()
+            if ret and self.slots and self.frames is None:
+                self.new_pool(frame.shape)
+            return ret, frame, None
+        finally:
+            end = time.perf_counter()
+            self.retrieve_time += end - retrieve_start
+            if self.metrics is not None:
+                self.metrics.observe(self.name, "read", end - start)
+
+    def new_pool(self, shape):
+        if self.frames is not None:
+            self.frames.retire()
+        self.frames = SharedFrames(shape, self.slots)
+
+    def current(self, generation):
+        return generation == self.generation and not self.stopping.is_set()
+
+    def run(self, generation):
+        cap = None
+        backoff = self.min_backoff
+        while self.current(generation):
+            if cap is None:
+                cap = self.open()
+                if cap is None:
+                    if not self.reconnect:
+                        print(f"Cannot open RTSP stream {self.name}")
+                        self.failed = True
+                        break
+                    print(f"Cannot open RTSP stream {self.name}, retrying in {backoff}s")
+                    self.stopping.wait(backoff)
+                    backoff = min(backoff * 2, self.max_backoff)
+                    continue
+                self.connected_at = time.monotonic()
+            ret, frame, slot = self.read(cap)
+            if not self.current(generation):
+                # We were stuck in read() and got replaced, or stopped
+                break
+            if not ret:
+                cap.release()
+                cap = None
+                self.connected_at = None
+                if not self.reconnect:
+                    print(f"Can't receive frame from {self.name} (stream end?).")
+                    self.failed = True
+                    break
+                # A camera that takes the connection and drops it at once
+                # waits like one that refuses it
+                print(f"Can't receive frame from {self.name}, reconnecting in {backoff}s")
+                self.reconnects += 1
+                self.stopping.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            # Only a frame shows the camera is really back
+            backoff = self.min_backoff
+            decoded_at = time.monotonic()
+            self.last_frame_at = decoded_at
+            if frame is None:
+                # Skipped by decode_every
+                continue
+            seq = self.buffer.seq + 1
+            if slot is not None:
+                self.frames.publish(slot, seq)
+            self.buffer.put(frame, decoded_at)
+            for listener in self.listeners:
+                listener(frame, decoded_at, slot, seq)
+        if cap is not None:
+            cap.release()
+        if generation != self.generation:
+            # The new reader owns the pool now
+            return
+        self.connected_at = None
+        if self.frames is not None:
+            self.frames.retire()
+        # Wake up the analysis loop so it notices we are gone
+        with self.buffer.new_frame:
+            self.buffer.new_frame.notify_all()
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self.restart()
+
+    def restart(self):
+        """Starts a new reader, the old one (if any) quits when it can."""
+        self.generation += 1
+        self.thread = threading.Thread(target=self.run, args=(self.generation,),
+                                       name=f"capture-{self.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+
+    def join(self, timeout=None):
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def alive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    @property
+    def decoded(self):
+        return self.buffer.seq
+
+    def decode_cost(self):
+        """Returns the average milliseconds of grab() per frame and of
+        retrieve() per retrieved frame."""
+        grab = self.grab_time / self.grabbed * 1000 if self.grabbed else 0.0
+        retrieved = self.grabbed // self.decode_every
+        retrieve = self.retrieve_time / retrieved * 1000 if retrieved else 0.0
+        return grab, retrieve
+
+    def health(self, now=None):
+        """Returns (seconds connected, reconnects, seconds since the last
+        frame), the times are None when they don't apply."""
+        now = time.monotonic() if now is None else now
+        uptime = now - self.connected_at if self.connected_at is not None else None
+        age = now - self.last_frame_at if self.last_frame_at is not None else None
+        return uptime, self.reconnects, age
+
+
+class Supervisor(threading.Thread):
+    """Restarts the reader of any network camera that is connected but has
+    not delivered a frame in stall_seconds."""
+
+    def __init__(self, cameras, stall_seconds=15, every=1):
+        super().__init__(name="capture-supervisor", daemon=True)
+        self.cameras = cameras
+        self.stall_seconds = stall_seconds
+        self.every = every
+        self.stopping = threading.Event()
+
+    def run(self):
+        while not self.stopping.wait(self.every):
+            now = time.monotonic()
+            for camera in self.cameras.values():
+                if not camera.reconnect or camera.connected_at is None:
+                    continue
+                last = max(camera.connected_at, camera.last_frame_at or 0)
+                if now - last > self.stall_seconds and not camera.stopping.is_set():
+                    print(f"{camera.name} stalled for {now - last:.0f}s, reconnecting")
+                    camera.reconnects += 1
+                    camera.connected_at = None
+                    camera.restart()
+
+    def stop(self):
+        self.stopping.set()
+
+
+class CaptureEngine:
+    """Runs one Camera thread per stream and hands the analysis loop the
+    new frames of every camera, see the reader modes at the top."""
+
+    def __init__(self, cameras, buffer_size=1, mode="latest", slots=0, stall_seconds=15,
+                 decode_every=1, capture_buffer=None, realtime=False, metrics=None):
+        if mode not in ("latest", "all"):
+            raise ValueError(f"Unknown reader mode {mode}")
+        self.mode = mode
+        self.new_frame = threading.Condition()
+        self.cameras = {
+            name: Camera(name, url, buffer_size, self.new_frame, slots,
+                         decode_every=decode_every, capture_buffer=capture_buffer,
+                         realtime=realtime, metrics=metrics)
+            for name, url in cameras.items()
+        }
+        # Last sequence number handed to the analysis loop, per camera
+        self.consumed = {name: 0 for name in self.cameras}
+        self.supervisor = Supervisor(self.cameras, stall_seconds)
+
+    def start(self):
+        for camera in self.cameras.values():
+            camera.start()
+        self.supervisor.start()
+
+    def stop(self):
+        self.supervisor.stop()
+        for camera in self.cameras.values():
+            camera.stop()
+        for camera in self.cameras.values():
+            camera.join(timeout=2)
+
+    def alive(self):
+        return any(camera.alive() for camera in self.cameras.values())
+
+    def _pending(self):
+        pending = []
+        for name, camera in self.cameras.items():
+            entries = camera.buffer.since(self.consumed[name], self.mode == "latest")
+            if not entries:
+                continue
+            # Anything between the last frame we handed out and the first one
+            # we hand out now was overwritten before anybody looked at it
+            camera.dropped += entries[0][0] - self.consumed[name] - 1
+            camera.analyzed += len(entries)
+            self.consumed[name] = entries[-1][0]
+            for seq, decoded_at, frame in entries:
+                pending.append((name, frame, decoded_at))
+        return pending
+
+    def wait(self, timeout=1.0):
+        """Blocks until at least one camera has a new frame (or timeout) and
+        returns a list of (camera name, frame, decoded_at).  decoded_at is
+        the time.monotonic() of the read, used to measure latency."""
+        deadline = time.monotonic() + timeout
+        with self.new_frame:
+            pending = self._pending()
+            while not pending and self.alive():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.new_frame.wait(remaining)
+                pending = self._pending()
+        return pending
+
+    def stats(self):
+        """Returns {camera: (decoded, analyzed, dropped)}."""
+        return {
+            name: (camera.decoded, camera.analyzed, camera.dropped)
+            for name, camera in self.cameras.items()
+        }
+
+    def health(self):
+        """Returns {camera: (seconds connected, reconnects, seconds since the
+        last frame)}, see Camera.health()."""
+        now = time.monotonic()
+        return {name: camera.health(now) for name, camera in self.cameras.items()}
@@ -0,0 +1,156 @@
+# Motion detectors for ringring.py
+# A detector gets the gray area covering all the zones of a camera (see
+# zones.CompiledZones) on every frame and returns a score per zone, the zone
+# is in motion when its score goes over its threshold.
+#
+#   mean    - the original one: every 30 frames the change of the mean
+#             brightness of the zone.  Blind between samples and to motion
+#             that keeps the brightness the same.
+#   diff    - every frame, the percent of pixels of the zone that changed
+#             more than pixel_threshold since the previous frame.
+#   average - percent of pixels that differ from a running average of the
+#             previous frames (cv2.accumulateWeighted).
+#   mog2    - percent of foreground pixels of OpenCV's MOG2 background
+#             subtractor.
+#   knn     - same with the KNN background subtractor.
+# All but mean report the same unit (percent of foreground pixels), so the
+# zone thresholds can be kept when switching between them.  The detector of
+# each camera is picked with --detector or "detector" in the zones file, use
+# benchdetectors.py to compare them on recorded clips.
+import cv2
+import numpy as np
+
+
+class Detector:
+    """Base class, score() is called with every analysis frame."""
+
+    def __init__(self, compiled):
+        self.compiled = compiled
+        self.results = {zone.name: 0.0 for zone, ys, xs, mask in compiled.parts}
+
+    def score(self, gray):
+        """Returns {zone name: score} for the gray area of a frame."""
+        raise NotImplementedError
+
+
+class MeanDetector(Detector):
+    """Change of the mean brightness of each zone, sampled every `every` frames."""
+
+    def __init__(self, compiled, every=30):
+        super().__init__(compiled)
+        self.every = every
+        self.counter = 0
+        self.last_means = None
+
+    def score(self, gray):
+        self.counter = (self.counter + 1) % self.every
+        if self.counter:
+            return self.results
+        means = {zone.name: cv2.mean(crop, mask)[0]
+                 for zone, crop, mask in self.compiled.crops(gray)}
+        if self.last_means is not None:
+            for name, mean in means.items():
+                self.results[name] = abs(mean - self.last_means[name])
+        self.last_means = means
+        return self.results
+
+
+class ForegroundDetector(Detector):
+    """Detectors that build a foreground mask (1 moving, 0 still) of the gray
+    area on every frame and report the percent of foreground pixels per zone.
+    The buffers are allocated on the first frame and then reused."""
+
+    def __init__(self, compiled):
+        super().__init__(compiled)
+        self.changed = None
+
+    def foreground(self, gray):
+        """Fills self.changed with the foreground mask, False on the frames
+        used to start the model."""
+        raise NotImplementedError
+
+    def score(self, gray):
+        if self.changed is None:
+            self.changed = np.empty_like(gray)
+        if self.foreground(gray):
+            # The mask is 0 or 1 so its mean is the ratio
+            for zone, crop, mask in self.compiled.crops(self.changed):
+                self.results[zone.name] = cv2.mean(crop, mask)[0] * 100
+        return self.results
+
+
+class FrameDiffDetector(ForegroundDetector):
+    """Pixels that changed more than pixel_threshold since the previous frame."""
+
+    def __init__(self, compiled, pixel_threshold=25):
+        super().__init__(compiled)
+        self.pixel_threshold = pixel_threshold
+        self.previous = None
+
+    def foreground(self, gray):
+        if self.previous is None:
+            self.previous = gray.copy()
+            return False
+        cv2.absdiff(gray, self.previous, self.changed)
+        cv2.threshold(self.changed, self.pixel_threshold, 1, cv2.THRESH_BINARY, dst=self.changed)
+        np.copyto(self.previous, gray)
+        return True
+
+
+class RunningAverageDetector(ForegroundDetector):
+    """Pixels that differ more than pixel_threshold from the running average
+    of the previous frames, alpha is how fast the average follows the scene."""
+
+    def __init__(self, compiled, pixel_threshold=25, alpha=0.05):
+        super().__init__(compiled)
+        self.pixel_threshold = pixel_threshold
+        self.alpha = alpha
+        self.average = None
+        self.background = None
+
+    def foreground(self, gray):
+        if self.average is None:
+            self.average = gray.astype(np.float32)
+            self.background = gray.copy()
+            return False
+        cv2.convertScaleAbs(self.average, dst=self.background)
+        cv2.absdiff(gray, self.background, self.changed)
+        cv2.threshold(self.changed, self.pixel_threshold, 1, cv2.THRESH_BINARY, dst=self.changed)
+        cv2.accumulateWeighted(gray, self.average, self.alpha)
+        return True
+
+
+class SubtractorDetector(ForegroundDetector):
+    """Wraps one of OpenCV's background subtractors, their mask is 0 or 255."""
+
+    def __init__(self, compiled, subtractor):
+        super().__init__(compiled)
+        self.subtractor = subtractor
+
+    def foreground(self, gray):
+        self.subtractor.apply(gray, self.changed)
+        cv2.threshold(self.changed, 127, 1, cv2.THRESH_BINARY, dst=self.changed)
+        return True
+
+
+def mog2_detector(compiled):
+    return SubtractorDetector(compiled, cv2.createBackgroundSubtractorMOG2(detectShadows=False))
+
+
+def knn_detector(compiled):
+    return SubtractorDetector(compiled, cv2.createBackgroundSubtractorKNN(detectShadows=False))
+
+
+DETECTORS = {
+    "mean": MeanDetector,
+    "diff": FrameDiffDetector,
+    "average": RunningAverageDetector,
+    "mog2": mog2_detector,
+    "knn": knn_detector,
+}
+
+
+def make_detector(name, compiled):
+    if name not in DETECTORS:
+        raise ValueError(f"Unknown detector {name}, use one of {', '.join(DETECTORS)}")
+    return DETECTORS[name](compiled)
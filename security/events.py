@@ -0,0 +1,165 @@
+# Motion events of ringring.py, delivered to Telegram
+# The analysis loop publishes a MotionEvent when a zone starts moving, the
+# event goes through loop.call_soon_threadsafe() onto an asyncio queue that
+# runs in its own thread, so publishing never waits for the network.  There a
+# consumer (TelegramNotifier) batches the events, keeps a minimum time between
+# messages and sends them with a JPEG of the zone.
+#
+# The notifier only needs an object with the async send_photo/send_message/
+# send_media_group of python-telegram-bot's Bot, so the price bot in
+# telegram/start.py can hand it its application.bot.
+import asyncio
+import threading
+import time
+from datetime import datetime
+
+import cv2
+
+
+class MotionEvent:
+    """A zone of a camera started moving.  snapshot is the BGR crop of the zone,
+    frame a copy of the whole frame when someone (snapshots.py) wants it."""
+
+    def __init__(self, camera, zone, score, snapshot=None, at=None, frame=None):
+        self.camera = camera
+        self.zone = zone
+        self.score = score
+        self.snapshot = snapshot
+        self.frame = frame
+        self.at = time.time() if at is None else at
+
+    def __repr__(self):
+        return f"MotionEvent({self.camera!r}, {self.zone!r}, {self.score:.2f})"
+
+    def caption(self):
+        return (f"{self.camera} {self.zone}: motion {self.score:.2f}"
+                f" at {datetime.fromtimestamp(self.at):%H:%M:%S}")
+
+
+class Debouncer:
+    """One event per burst of motion: a zone only gets a new event after it
+    was quiet for `quiet` seconds, so someone walking by is one message."""
+
+    def __init__(self, quiet=30):
+        self.quiet = quiet
+        self.last_motion = {}
+
+    def check(self, key, now=None):
+        """Call it on every frame key is moving, True if it is a new event."""
+        now = time.monotonic() if now is None else now
+        last = self.last_motion.get(key)
+        self.last_motion[key] = now
+        return last is None or now - last > self.quiet
+
+
+class EventBus:
+    """An asyncio loop in its own thread feeding one consumer coroutine."""
+
+    def __init__(self, consumer, maxsize=100):
+        self.consumer = consumer
+        self.maxsize = maxsize
+        self.loop = asyncio.new_event_loop()
+        self.queue = None
+        self.task = None
+        self.dropped = 0
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="event-bus", daemon=True)
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.queue = asyncio.Queue(self.maxsize)
+        self.task = self.loop.create_task(self.consumer(self.queue))
+        self.ready.set()
+        self.loop.run_until_complete(self.task)
+        self.loop.close()
+
+    def start(self):
+        self.thread.start()
+        self.ready.wait()
+
+    def publish(self, event):
+        """Can be called from any thread, never blocks."""
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def stop(self, timeout=10):
+        """Lets the consumer send what it has and waits for it."""
+        if self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, None)
+            self.thread.join(timeout)
+
+
+def encode_jpeg(image, quality=80):
+    ret, jpeg = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return jpeg.tobytes() if ret else None
+
+
+class TelegramNotifier:
+    """Consumer for EventBus: waits batch_seconds after the first event to
+    collect the ones that come with it and sends at most one message every
+    min_interval seconds.  None on the queue means finish."""
+
+    def __init__(self, bot, chat_id, batch_seconds=3, min_interval=10, max_photos=10):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.batch_seconds = batch_seconds
+        self.min_interval = min_interval
+        self.max_photos = max_photos
+        self.last_sent = None
+        self.sent = 0
+
+    async def __call__(self, queue):
+        loop = asyncio.get_running_loop()
+        finished = False
+        while not finished:
+            event = await queue.get()
+            if event is None:
+                return
+            batch = [event]
+            deadline = loop.time() + self.batch_seconds
+            if self.last_sent is not None:
+                deadline = max(deadline, self.last_sent + self.min_interval)
+            while not finished:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    event = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if event is None:
+                    finished = True
+                else:
+                    batch.append(event)
+            await self.send(batch)
+            self.last_sent = loop.time()
+
+    async def send(self, batch):
+        loop = asyncio.get_running_loop()
+        photos = []
+        for event in batch[:self.max_photos]:
+            if event.snapshot is not None:
+                # Encoding is CPU work, keep it off the loop
+                jpeg = await loop.run_in_executor(None, encode_jpeg, event.snapshot)
+                if jpeg is not None:
+                    photos.append((jpeg, event.caption()))
+        text = "\n".join(event.caption() for event in batch)
+        try:
+            if len(photos) == 1:
+                await self.bot.send_photo(self.chat_id, photo=photos[0][0], caption=text)
+            elif photos:
+                from telegram import InputMediaPhoto
+                media = [InputMediaPhoto(jpeg, caption=caption) for jpeg, caption in photos]
+                await self.bot.send_media_group(self.chat_id, media)
+                if len(batch) > len(photos):
+                    await self.bot.send_message(self.chat_id, text)
+            else:
+                await self.bot.send_message(self.chat_id, text)
+            self.sent += 1
+        except Exception as e:
+            print(f"Could not send {len(batch)} motion events to Telegram: {e}")
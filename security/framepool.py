@@ -0,0 +1,83 @@
+# Decoded frames in shared memory, so nobody copies or reallocates them.
+# Every camera gets a block with `slots` preallocated frames.  The capture
+# thread decodes straight into a free slot (cap.read(image=...)) and then the
+# analysis, the recorder and the display all use that same array, the
+# analysis processes (workers.py) reach it by slot index.
+#
+# A slot is free again when no one in this process holds its array any more
+# (its reference count, views of it count too).  Each slot also has the
+# sequence number of the frame it holds, it is -1 while the slot is being
+# written, so a worker process that finds the same number before and after
+# using a slot knows it was not overwritten meanwhile (a seqlock).
+import sys
+from multiprocessing import shared_memory
+
+import numpy as np
+
+SEQ_BYTES = 8
+# References to a slot nobody uses: self.views and getrefcount's argument
+FREE_REFS = 2
+
+
+class SharedFrames:
+    """A pool of frame slots of one camera in shared memory."""
+
+    def __init__(self, shape, slots=8, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        frame_bytes = int(np.prod(self.shape))
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * (SEQ_BYTES + frame_bytes))
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.seqs = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf)
+        # One array per slot, so the references to each can be counted
+        self.views = [np.ndarray(self.shape, dtype=np.uint8, buffer=self.shm.buf,
+                                 offset=slots * SEQ_BYTES + slot * frame_bytes)
+                      for slot in range(slots)]
+        if self.owner:
+            self.seqs[:] = 0
+        self.next = 0
+
+    def spec(self):
+        """What another process needs to attach() to this block."""
+        return self.shm.name, self.shape, self.slots
+
+    @classmethod
+    def attach(cls, spec):
+        name, shape, slots = spec
+        return cls(shape, slots, name)
+
+    def acquire(self):
+        """Returns a slot nobody is using and marks it as being written, or
+        None if all of them are taken."""
+        for i in range(self.slots):
+            slot = (self.next + i) % self.slots
+            if sys.getrefcount(self.views[slot]) <= FREE_REFS:
+                self.next = slot + 1
+                self.seqs[slot] = -1
+                return slot
+        return None
+
+    def publish(self, slot, seq):
+        """The slot now holds frame seq."""
+        self.seqs[slot] = seq
+
+    def valid(self, slot, seq):
+        """True if the slot still holds the frame seq."""
+        return self.seqs[slot] == seq
+
+    def retire(self):
+        """Removes the block once the owner is done with it.  The memory goes
+        away when the last array using it does."""
+        if self.owner:
+            self.shm.unlink()
+
+    def close(self):
+        # The arrays must go before the memory can be closed
+        del self.seqs, self.views
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,172 @@
+# Where the frame time goes in ringring.py.
+# Every stage of a frame (read, crop, cvtColor, score, draw, display) is timed
+# with time.perf_counter() and counted into a fixed set of buckets per camera,
+# so keeping them costs the same after a week as after a minute.  They can be
+# seen two ways:
+#   - a summary line per camera every --stats-every seconds, with the mean and
+#     95th percentile of every stage over that interval
+#   - http://127.0.0.1:PORT/metrics (--metrics-port) in the text format of
+#     Prometheus, the histograms plus whatever the gauges callback adds
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STAGES = ("read", "crop", "cvtColor", "score", "draw", "display")
+# Upper bounds of the buckets, seconds
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class Histogram:
+    """Counts of observations per bucket, the last count is everything over
+    the biggest bucket."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def copy(self):
+        other = Histogram(self.buckets)
+        other.counts = list(self.counts)
+        other.count = self.count
+        other.total = self.total
+        return other
+
+    def since(self, before):
+        """The observations made after the copy() before was taken."""
+        other = Histogram(self.buckets)
+        other.counts = [now - then for now, then in zip(self.counts, before.counts)]
+        other.count = self.count - before.count
+        other.total = self.total - before.total
+        return other
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        """Estimated like Prometheus' histogram_quantile, interpolating inside
+        the bucket, over the biggest bucket it is that bucket's bound."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class Metrics:
+    """The stage histograms of every camera.  Each histogram is only written
+    by one thread (the capture thread for read, the analysis loop for the
+    rest), the HTTP server only reads them."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.histograms = {}
+        # Copies taken at the last summary, to report only that interval
+        self.summarized = {}
+
+    def histogram(self, camera, stage):
+        key = (camera, stage)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(self.buckets)
+        return histogram
+
+    def observe(self, camera, stage, seconds):
+        self.histogram(camera, stage).observe(seconds)
+
+    def observe_all(self, camera, timings):
+        """timings is {stage: seconds}, as analyze() leaves it in the state."""
+        for stage, seconds in timings.items():
+            self.histogram(camera, stage).observe(seconds)
+
+    def summary(self, camera):
+        """One line with the mean/p95 ms of every stage of camera since the
+        last summary, None if nothing happened."""
+        parts = []
+        for stage in STAGES:
+            histogram = self.histograms.get((camera, stage))
+            if histogram is None:
+                continue
+            before = self.summarized.get((camera, stage))
+            now = histogram.copy()
+            self.summarized[(camera, stage)] = now
+            interval = now.since(before) if before is not None else now
+            if interval.count:
+                parts.append(f"{stage} {interval.mean() * 1000:.2f}/"
+                             f"{interval.quantile(0.95) * 1000:.2f}")
+        if not parts:
+            return None
+        return f"{camera} stage ms mean/p95 " + " ".join(parts)
+
+    def exposition(self):
+        """The histograms in the Prometheus text format."""
+        lines = ["# HELP ringring_stage_seconds Time spent in each stage of a frame.",
+                 "# TYPE ringring_stage_seconds histogram"]
+        # copy(): the capture and analysis threads may add histograms meanwhile
+        for (camera, stage), histogram in sorted(self.histograms.copy().items()):
+            histogram = histogram.copy()
+            labels = f'camera="{camera}",stage="{stage}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'ringring_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'ringring_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"ringring_stage_seconds_sum{{{labels}}} {histogram.total:.6f}")
+            lines.append(f"ringring_stage_seconds_count{{{labels}}} {histogram.count}")
+        return lines
+
+
+class MetricsServer:
+    """Serves /metrics on a local port from a daemon thread.  gauges, if
+    given, is called on every scrape and returns more exposition lines."""
+
+    def __init__(self, metrics, port, host="127.0.0.1", gauges=None):
+        self.metrics = metrics
+        self.gauges = gauges
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = ("\n".join(server.lines()) + "\n").encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Not a line for every scrape
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="metrics", daemon=True)
+
+    def lines(self):
+        lines = self.metrics.exposition()
+        if self.gauges is not None:
+            lines += self.gauges()
+        return lines
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
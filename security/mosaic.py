@@ -0,0 +1,98 @@
+# One preview window for all the cameras of ringring.py (--mosaic).
+# A window per camera means an imshow() of every full size frame, with many
+# cameras the display eats the time of the analysis.  The mosaic keeps one
+# canvas, allocated once, with a small tile per camera: the loop only hands
+# it the newest frame of each camera (a reference, no copy) and at most
+# preview_fps times a second the new frames are shrunk straight into their
+# tiles, the zones drawn on top and the canvas shown.  Frames that came in
+# between previews are never touched.
+import math
+import time
+
+import cv2
+import numpy as np
+
+LABEL_COLOR = (255, 255, 255)
+STILL_COLOR = (2, 255, 2)
+MOTION_COLOR = (2, 2, 255)
+
+
+class Mosaic:
+    """Tiles of tile_size (width, height) in a grid, columns defaults to the
+    smallest square grid that fits all the cameras."""
+
+    def __init__(self, names, tile_size=(480, 270), columns=None, preview_fps=10,
+                 window="Mosaic"):
+        self.names = list(names)
+        self.tile_size = tile_size
+        self.columns = columns or math.ceil(math.sqrt(len(self.names)))
+        rows = math.ceil(len(self.names) / self.columns)
+        width, height = tile_size
+        self.canvas = np.zeros((rows * height, self.columns * width, 3), dtype=np.uint8)
+        self.tiles = {}
+        for index, name in enumerate(self.names):
+            row, column = divmod(index, self.columns)
+            self.tiles[name] = self.canvas[row * height:(row + 1) * height,
+                                           column * width:(column + 1) * width]
+        self.interval = 1 / preview_fps
+        self.next_render = 0.0
+        self.window = window
+        # Newest frame of every camera since the last render
+        self.pending = {}
+        # Zones of every camera scaled to its tile, by the frame size they were scaled for
+        self.shapes = {}
+
+    def setup_window(self):
+        cv2.namedWindow(self.window, cv2.WINDOW_NORMAL)
+        cv2.resizeWindow(self.window, self.canvas.shape[1], self.canvas.shape[0])
+
+    def put(self, name, frame):
+        """Keeps the frame for the next render, replacing the one before."""
+        self.pending[name] = frame
+
+    def due(self, now=None):
+        now = time.monotonic() if now is None else now
+        return now >= self.next_render
+
+    def zone_shapes(self, state, frame_shape):
+        """Returns [(zone, points)] with the zones of state in tile pixels."""
+        key = (state.name, frame_shape[:2])
+        shapes = self.shapes.get(key)
+        if shapes is None:
+            # The zones are in main stream pixels, the frame may be the substream
+            width, height = state.main_size or (frame_shape[1], frame_shape[0])
+            fx, fy = self.tile_size[0] / width, self.tile_size[1] / height
+            shapes = []
+            for zone in state.zones:
+                roi = zone.roi
+                corners = zone.polygon or [(roi.x0, roi.y0), (roi.x1, roi.y0),
+                                           (roi.x1, roi.y1), (roi.x0, roi.y1)]
+                points = np.array([(x * fx, y * fy) for x, y in corners], dtype=np.int32)
+                shapes.append((zone, points))
+            self.shapes[key] = shapes
+        return shapes
+
+    def render(self, states, now=None):
+        """Shrinks the new frames into their tiles and shows the canvas, if a
+        preview is due.  Returns True if it showed one."""
+        now = time.monotonic() if now is None else now
+        if not self.due(now):
+            return False
+        self.next_render = now + self.interval
+        for name, frame in self.pending.items():
+            tile = self.tiles[name]
+            cv2.resize(frame, self.tile_size, dst=tile, interpolation=cv2.INTER_AREA)
+            state = states[name]
+            for zone, points in self.zone_shapes(state, frame.shape):
+                motion = state.moving[zone.name]
+                cv2.polylines(tile, [points], True, MOTION_COLOR if motion else STILL_COLOR, 2)
+                if motion:
+                    x, y = points[0]
+                    cv2.putText(tile, zone.name, (int(x), max(int(y) - 4, 12)),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.4, MOTION_COLOR, 1, cv2.LINE_AA)
+            cv2.putText(tile, name, (6, 16), cv2.FONT_HERSHEY_SIMPLEX, 0.5, LABEL_COLOR, 1,
+                        cv2.LINE_AA)
+        # Let go of the frames, they may be slots of the frame pool
+        self.pending.clear()
+        cv2.imshow(self.window, self.canvas)
+        return True
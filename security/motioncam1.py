@@ -1,1773 +1,170 @@
-import pandas as pd
+# Plots the motion scores of a camera that ringring.py --scores saved.
+# Before, the scores were the "Counter" lines of ringring.py pasted here by
+# hand into a DataFrame, now the score columns (scorelog.py) are memory
+# mapped and only the rows of the time range asked for are read.
+# A long range is drawn from the min/max/mean pyramids (pyramid.py) instead of
+# every score, at the level that fits what is visible, and zooming in with
+# the matplotlib toolbar loads finer levels, down to the raw scores.
+# With --rescore it instead counts the alerts every zone would have given
+# with each combination of --thresholds, --releases and --quiets (rescore.py),
+# and with --events it lists the bursts of motion of every zone and how many
+# started each hour (segments.py).  --build-baseline learns the usual activity
+# of every hour of the week from --start to --end (default: the last 8 weeks)
+# and --anomalies lists the minutes over it (baseline.py).
+#
+#   python motioncam1.py scores/ --camera cam1 --start "2024-05-01 18:00" --end "2024-05-02 06:00"
+#   python motioncam1.py scores/ --camera cam1 --camera cam2 --rescore --thresholds 0.5,1,2
+#   python motioncam1.py scores/ --camera cam1 --events --threshold 0.1 --gap 3
+#   python motioncam1.py scores/ --camera cam1 --anomalies --start 2024-05-01
+import argparse
+import os
+import time
+from datetime import datetime
 
-anarray = pd.DataFrame( {'cam1': [0.00570370370370199
-,0.04311111111111643
-,0.017185185185184082
-,0.003999999999997783
-,0.0396296296296299
-,0.05288888888888721
-,0.0064444444444475835
-,0.02377777777777368
-,0.02537037037037493
-,3.7037037031950604e-05
-,0.0
-,0.0
-,0.0
-,0.0001851851851810693
-,0.0
-,0.0
-,0.0
-,0.023407407407404435
-,0.0
-,0.02259259259259494
-,0.0026666666666699257
-,0.0026666666666699257
-,0.057370370370371404
-,0.010740740740743604
-,0.16651851851851518
-,0.15277777777777857
-,0.030629629629629562
-,0.11859259259259147
-,0.003703703703706651
-,0.043333333333336554
-,0.027000000000001023
-,0.0009629629629657188
-,0.0009629629629657188
-,0.012592592592589824
-,0.006740740740738715
-,0.0
-,0.0
-,0.0
-,0.021000000000000796
-,0.0047037037037043206
-,0.002148148148151563
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0008888888888947122
-,0.0010370370370438309
-,0.1092962962963
-,0.13222222222222513
-,0.025851851851854235
-,0.12055555555555486
-,7.407407407100663e-05
-,0.02955555555555378
-,0.010925925925924673
-,0.11714814814815355
-,0.12133333333333951
-,0.028074074074076805
-,0.012592592592589824
-,0.06588888888888533
-,0.0027777777777799884
-,0.00011111111111006267
-,0.0038888888888877204
-,0.012259259259259636
-,0.04411111111110699
-,0.0
-,0.0
-,0.0
-,0.01744444444445037
-,0.0
-,0.007185185185178966
-,0.0
-,0.0074444444444381475
-,0.13229629629629613
-,0.049888888888887095
-,0.0034814814814794204
-,0.08296296296295935
-,0.06618518518518357
-,0.023333333333333428
-,0.001740740740743263
-,0.004407407407406083
-,0.059037037037036555
-,0.0416666666666643
-,0.0375925925925884
-,0.0001481481481491187
-,0.0001481481481491187
-,0.005518518518520921
-,0.00022222222222012533
-,0.0010370370370367255
-,0.0010370370370367255
-,0.0
-,0.004777777777782433
-,0.002777777777772883
-,0.0012962962962959068
-,0.010185185185186185
-,0.015037037037039624
-,0.0022962962962935762
-,0.004074074074075895
-,0.05988888888889221
-,0.006333333333330415
-,0.0519999999999996
-,0.006296296296291359
-,0.0495555555555498
-,0.007481481481484309
-,3.703703703905603e-05
-,0.020629629629624446
-,0.003333333333337407
-,0.07462962962962649
-,0.04566666666666919
-,0.08266666666666822
-,0.0
-,0.0
-,0.061037037037031894
-,0.0
-,0.11233333333333917
-,0.102370370370366
-,0.016703703703704775
-,0.005222222222222683
-,0.03870370370370324
-,0.02233333333333576
-,0.01244444444444781
-,0.006999999999997897
-,0.006999999999997897
-,0.03418518518517999
-,0.1014814814814784
-,0.006000000000000227
-,0.06629629629629363
-,0.05585185185185537
-,0.0
-,0.010222222222225241
-,0.0024074074074107443
-,0.0
-,0.0035925925925965885
-,0.015407407407401763
-,0.05700000000000216
-,0.0688518518518535
-,0.0
-,0.0
-,0.1105185185185178
-,0.051962962962960546
-,0.004740740740743377
-,0.073814814814817
-,0.005518518518520921
-,0.006407407407408527
-,0.0
-,0.019851851851846902
-,0.015185185185188743
-,0.007962962962963616
-,0.29633333333332956
-,0.016666666666672825
-,0.003740740740745707
-,0.012962962962966174
-,0.013074074074076236
-,0.011444444444450141
-,0.011444444444450141
-,0.032999999999994145
-,0.0015185185185231376
-,0.009592592592596816
-,0.008296296296300909
-,0.0
-,0.0
-,0.0
-,0.0
-,0.013555555555555543
-,0.01729629629630125
-,0.006185185185188402
-,0.006185185185188402
-,0.008851851851851222
-,0.006185185185181297
-,0.0
-,0.013592592592594599
-,0.0
-,0.041148148148145935
-,0.10470370370370574
-,0.037037037037030984
-,0.018592592592597157
-,0.013518518518516487
-,0.045444444444441956
-,0.045444444444441956
-,0.0002962962962982374
-,0.03762962962962746
-,0.007444444444445253
-,0.0
-,0.0
-,0.0
-,0.0
-,0.004148148148154007
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0763333333333307
-,0.0
-,0.059629629629625924
-,0.0049999999999954525
-,0.0
-,0.00037037037036924403
-,0.0020000000000024443
-,0.014555555555560318
-,0.15659259259258818
-,0.0021851851851835136
-,0.17300000000000182
-,0.0
-,0.024629629629629335
-,0.005629629629623878
-,0.010851851851853667
-,0.0
-,0.0
-,0.07655555555555793
-,0.0
-,0.0
-,0.01262962962962888
-,0.006592592592589597
-,0.0026296296296308697
-,0.0
-,0.0
-,0.02774074074073951
-,0.014333333333333087
-,0.014333333333333087
-,0.0
-,0.1175925925925938
-,0.0
-,0.015148148148149687
-,0.06366666666666987
-,0.02070370370370256
-,0.02681481481481285
-,0.0688518518518535
-,0.07896296296296157
-,0.01177777777778033
-,0.0
-,0.0
-,0.0
-,0.0008148148148166001
-,0.019037037037037408
-,0.010740740740743604
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.059444444444444855
-,0.045037037037033656
-,0.0
-,0.0816296296296315
-,0.0
-,0.0
-,0.0
-,0.0005925925925964748
-,0.08555555555555827
-,0.09596296296296458
-,0.008259259259254748
-,0.018962962962959296
-,0.14588888888889073
-,0.054518518518513304
-,0.07385185185184895
-,0.02300000000000324
-,0.0
-,0.0011851851851858441
-,0.07681481481481711
-,0.0
-,0.0
-,0.009444444444447697
-,0.020333333333333314
-,0.006555555555557646
-,0.006555555555557646
-,0.0
-,0.06796296296296589
-,0.023666666666663616
-,0.0
-,0.03407407407406993
-,0.03407407407406993
-,0.0
-,0.0
-,0.015037037037032519
-,0.10151851851851745
-,0.004962962962963502
-,0.08766666666666367
-,0.007074074074068903
-,0.0
-,0.027555555555551337
-,0.03333333333333144
-,0.03333333333333144
-,0.06433333333333024
-,0.0005555555555574188
-,0.008259259259261853
-,0.008259259259261853
-,0.0
-,0.0
-,0.0
-,0.0
-,0.019777777777775896
-,0.01970370370370489
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.08177777777778061
-,0.0783703703703651
-,0.005444444444449914
-,0.11644444444444702
-,0.05996296296296322
-,0.026000000000003354
-,0.00448148148147709
-,0.011888888888890392
-,3.7037037031950604e-05
-,0.0
-,0.0011851851851858441
-,0.052481481481486014
-,0.01688888888889295
-,0.009851851851855997
-,0.061037037037039
-,0.0
-,0.0
-,0.0
-,0.0
-,0.006999999999997897
-,0.006999999999997897
-,0.16459259259259795
-,0.16351851851852217
-,0.0013333333333349628
-,0.0013333333333349628
-,0.02762962962962945
-,0.1307777777777801
-,0.0
-,0.12159259259259159
-,0.002555555555559863
-,0.0
-,0.038925925925923366
-,3.703703703905603e-05
-,0.07770370370370472
-,0.0
-,0.09933333333333394
-,0.0
-,0.0
-,0.00025925925925918136
-,0.008148148148144685
-,0.0
-,0.006444444444440478
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.16459259259259795
-,0.009518518518518704
-,0.053185185185185446
-,0.1414444444444456
-,0.11470370370370375
-,0.038518518518515066
-,0.03859259259259318
-,0.07766666666666566
-,0.0010740740740757815
-,0.04737037037036629
-,0.09144444444444133
-,0.07625925925925969
-,0.07425925925925725
-,0.03440740740740722
-,0.012111111111110517
-,0.0
-,0.02803703703703775
-,0.013185185185186299
-,0.043518518518517624
-,0.0014074074074059695
-,0.05618518518518556
-,0.00833333333333286
-,0.020666666666670608
-,0.0
-,0.039888888888889085
-,0.07522222222222297
-,0.0998518518518523
-,0.003185185185181183
-,0.027444444444441274
-,0.02870370370370523
-,0.01729629629630125
-,0.01729629629630125
-,0.0
-,0.0
-,0.011407407407411085
-,0.005444444444442809
-,0.04829629629629295
-,0.013592592592587494
-,0.03422222222222615
-,0.006888888888887834
-,0.05074074074074275
-,0.0
-,0.027037037037032974
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0002962962962982374
-,0.0
-,0.11966666666666725
-,0.008814814814812166
-,0.07125925925925713
-,0.008888888888890278
-,0.0528148148148162
-,0.048629629629630244
-,0.07955555555555804
-,0.05792592592592882
-,0.009074074074071348
-,0.1304444444444428
-,0.0071851851851860715
-,0.02803703703703775
-,0.06711111111111023
-,0.015592592592589938
-,7.407407407811206e-05
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0021111111111054015
-,0.006000000000000227
-,0.02155555555555111
-,0.002407407407403639
-,0.0017407407407361575
-,0.0
-,0.012999999999998124
-,0.049481481481478795
-,0.07540740740741114
-,0.032148148148145594
-,0.01244444444444781
-,0.03474074074074451
-,7.407407407100663e-05
-,0.04077777777777669
-,0.014333333333333087
-,0.05592592592592638
-,0.015259259259252644
-,0.054555555555559465
-,0.0
-,0.1332222222222228
-,0.007259259259257078
-,0.007259259259257078
-,0.0042592592592569645
-,0.0042592592592569645
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.002037037037034395
-,0.0
-,0.0
-,0.07318518518518857
-,0.03418518518517999
-,0.004296296296303126
-,0.10388888888888914
-,0.008000000000002672
-,0.003259259259259295
-,0.05314814814814639
-,0.0
-,0.0015555555555550882
-,0.004111111111114951
-,0.04240740740740989
-,0.006074074074071234
-,0.014925925925922456
-,0.009777777777777885
-,0.009777777777777885
-,0.0014814814814840815
-,0.009333333333337634
-,0.009074074074071348
-,0.006999999999997897
-,0.0
-,0.0
-,0.007370370370367141
-,0.08796296296296191
-,0.05840740740740813
-,0.0
-,0.23907407407407533
-,0.17892592592592393
-,0.03292592592592314
-,0.19981481481481467
-,0.017592592592592382
-,0.011888888888890392
-,0.023555555555553553
-,0.010259259259257192
-,0.010259259259257192
-,0.0
-,0.11500000000000199
-,0.0
-,0.01122222222222291
-,0.0
-,0.01848148148147999
-,0.0009259259259266628
-,7.407407407100663e-05
-,0.0
-,0.0
-,0.0030740740740782257
-,0.00385185185185577
-,0.0
-,0.0
-,0.0
-,0.0020370370370415003
-,0.269851851851854
-,0.15007407407406959
-,0.0
-,0.054333333333332234
-,0.025481481481477886
-,0.19207407407407118
-,0.24981481481481183
-,0.05588888888888732
-,0.02055555555555344
-,0.04762962962962547
-,0.0
-,0.001777777777782319
-,0.0
-,0.07314814814814952
-,0.03796296296295765
-,0.07403703703703712
-,0.07403703703703712
-,0.0
-,0.14122222222222547
-,0.0
-,0.002888888888890051
-,0.020629629629624446
-,0.03125925925926509
-,0.0
-,0.06496296296295867
-,0.4574444444444481
-,0.22877777777777908
-,0.05051851851851552
-,0.24025925925926117
-,0.03999999999999915
-,0.21162962962963405
-,0.0792592592592527
-,0.00833333333333286
-,0.0
-,0.003629629629628539
-,0.2753333333333359
-,0.023296296296294372
-,0.024481481481480216
-,0.0026666666666699257
-,0.0026666666666699257
-,0.007814814814814497
-,0.016814814814814838
-,0.0
-,0.0
-,0.0004814814814864121
-,0.0037037037036995457
-,0.365000000000002
-,0.21422222222222587
-,0.08896296296296669
-,0.15311111111110876
-,0.366518518518518
-,0.04618518518518755
-,0.0
-,0.08955555555555605
-,0.025851851851854235
-,0.06229629629629585
-,0.12348148148148397
-,0.0023333333333326323
-,0.0023333333333326323
-,0.0
-,0.005777777777780102
-,0.0
-,0.0
-,0.013185185185186299
-,0.03451851851851728
-,0.02748148148148033
-,0.025296296296296816
-,0.02748148148148033
-,0.02748148148148033
-,0.08925925925925782
-,0.03681481481481086
-,0.0028148148148190444
-,0.04977777777777703
-,0.0
-,0.004222222222225014
-,0.24800000000000466
-,0.028925925925925355
-,0.11411111111111438
-,0.04159259259259329
-,0.022888888888886072
-,0.003999999999997783
-,0.0005925925925964748
-,0.021851851851849347
-,0.0
-,3.703703703905603e-05
-,0.0
-,0.0014444444444450255
-,0.0014444444444450255
-,0.0
-,0.023111111111113303
-,0.00570370370370199
-,0.012333333333330643
-,0.0
-,0.0038518518518486644
-,0.010074074074076123
-,0.010074074074076123
-,0.0
-,0.001111111111107732
-,0.0
-,0.0
-,0.03911111111111154
-,0.24411111111110984
-,0.009851851851855997
-,0.16400000000000148
-,0.10648148148148096
-,0.01096296296296373
-,0.012888888888888062
-,0.00025925925925918136
-,0.029037037037042523
-,0.0
-,0.029925925925923025
-,0.08714814814814531
-,0.05733333333333235
-,0.10092592592592808
-,0.0837407407407369
-,0.011000000000002785
-,0.009777777777777885
-,0.07474074074074366
-,0.0701481481481494
-,0.0031481481481492324
-,0.03574074074073508
-,0.11477777777778186
-,0.0016296296296332002
-,0.0
-,0.0026666666666628203
-,0.27607407407407436
-,0.04714814814814616
-,0.15400000000000347
-,0.07407407407407618
-,0.01014814814814713
-,0.05225925925925878
-,0.0027037037037089817
-,0.0193703703703747
-,0.17437037037037584
-,0.0317407407407444
-,0.01581481481481717
-,0.006481481481479534
-,0.006481481481479534
-,0.1447037037037049
-,0.0606296296296307
-,0.0
-,0.0
-,0.0
-,0.04066666666666663
-,0.0
-,0.0
-,0.00833333333333286
-,0.011407407407411085
-,0.0030370370370391697
-,0.03674074074073985
-,0.02407407407407902
-,0.026740740740734736
-,0.03570370370370313
-,0.15018518518518675
-,0.24359259259259147
-,0.011481481481482092
-,0.004925925925924446
-,0.08070370370370483
-,0.007296296296296134
-,0.0007407407407384881
-,0.0
-,0.10307407407407254
-,0.10307407407407254
-,0.015555555555550882
-,0.10814814814815321
-,0.0
-,0.10222222222222399
-,0.0
-,0.0
-,0.002111111111112507
-,0.0
-,0.07985185185184918
-,0.07985185185184918
-,0.04959259259258886
-,0.0
-,0.11025925925925861
-,0.0075185185185162595
-,0.08196296296296168
-,0.11500000000000199
-,0.153407407407407
-,0.11440740740740551
-,0.0173333333333332
-,0.0008518518518485507
-,0.06707407407407828
-,0.00918518518518141
-,0.0035185185185184764
-,0.06277777777777516
-,0.011592592592592155
-,0.0
-,0.006481481481479534
-,0.07859259259259233
-,0.07351851851851876
-,0.0
-,0.07070370370370682
-,0.0
-,0.0
-,0.0042962962962960205
-,0.0
-,0.0007037037037065375
-,0.0007037037037065375
-,0.06700000000000017
-,0.08507407407407186
-,0.01714814814815213
-,0.0759259259259224
-,0.02092592592592979
-,0.04240740740740989
-,0.008888888888890278
-,0.004740740740736271
-,0.023777777777780784
-,0.0
-,0.019666666666665833
-,0.07955555555555804
-,0.04307407407407737
-,0.0015925925925941442
-,0.04603703703703843
-,0.004111111111114951
-,0.0
-,0.0
-,0.01955555555555577
-,0.0
-,0.0
-,0.0
-,0.0
-,0.003925925925919671
-,0.003925925925919671
-,0.16851851851851762
-,0.014222222222223024
-,0.15240740740740932
-,0.07900000000000063
-,0.07622222222222064
-,0.015925925925920126
-,0.0
-,0.0037777777777776578
-,0.09874074074074457
-,0.01766666666666339
-,0.04740740740741245
-,0.009555555555550654
-,0.005222222222222683
-,0.0
-,0.002888888888890051
-,0.00025925925925918136
-,0.007851851851853553
-,0.0
-,0.017000000000003013
-,0.0
-,0.006000000000000227
-,0.0010000000000047748
-,0.0010000000000047748
-,0.042148148148143605
-,0.00611111111111029
-,0.27600000000000335
-,0.06655555555555992
-,0.0043703703703741326
-,0.015148148148142582
-,0.0036296296296356445
-,0.0005185185185183627
-,0.01303703703703718
-,0.008185185185183741
-,0.004592592592594258
-,0.013777777777782774
-,0.013111111111115292
-,0.0
-,0.02585185185184713
-,0.0015185185185231376
-,0.005703703703709095
-,0.007259259259264184
-,0.010703703703704548
-,0.0
-,0.006259259259259409
-,0.0
-,0.0
-,0.0
-,0.0
-,0.04637037037036862
-,0.00529629629629369
-,0.23088888888889159
-,0.1372962962962987
-,0.009740740740738829
-,0.04366666666666674
-,0.04885185185185037
-,0.020444444444443377
-,0.0038888888888877204
-,0.0804074074074066
-,0.009037037037039397
-,0.004518518518523251
-,0.00225925925925452
-,0.09137037037037032
-,0.030444444444448493
-,0.06755555555555759
-,0.017814814814812507
-,0.046962962962965094
-,0.11622222222221978
-,0.02829629629629693
-,0.047222222222224275
-,0.06199999999999761
-,0.004370370370367027
-,0.011555555555553099
-,0.0018888888888852762
-,0.026888888888883855
-,0.024925925925920467
-,0.17507407407406816
-,0.06737037037036941
-,0.007703703703704434
-,0.02937037037037271
-,0.008518518518521034
-,0.0005925925925964748
-,0.03185185185184736
-,0.010518518518523479
-,0.0025925925925918136
-,0.03288888888889119
-,0.05066666666666464
-,0.027555555555551337
-,0.0017037037037042069
-,0.08018518518518647
-,0.020333333333333314
-,0.0
-,0.15181481481481285
-,0.04940740740740779
-,0.10096296296296714
-,0.07048148148147959
-,0.04492592592592359
-,0.04918518518518766
-,0.04081481481481575
-,0.0420740740740726
-,0.1791111111111121
-,0.15696296296296453
-,0.010037037037037067
-,0.058777777777777374
-,0.013777777777775668
-,0.02196296296295941
-,0.03144444444444616
-,0.047222222222224275
-,0.004592592592594258
-,0.02896296296296441
-,0.0
-,0.006296296296298465
-,0.0
-,0.0973333333333315
-,0.01929629629629659
-,0.043518518518517624
-,0.035888888888884196
-,0.0030000000000001137
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.1295555555555552
-,0.03733333333332922
-,0.002925925925929107
-,0.09303703703703547
-,0.06007407407407328
-,0.02218518518518664
-,0.013333333333335418
-,0.0
-,0.0
-,0.0
-,0.031296296296297044
-,0.0
-,0.013518518518523592
-,0.0
-,0.004074074074075895
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.005629629629630983
-,0.005629629629630983
-,0.18577777777777982
-,0.05759259259259153
-,0.029037037037042523
-,0.0012962962962959068
-,0.001111111111107732
-,0.05659259259259386
-,0.0
-,0.002111111111112507
-,7.407407407811206e-05
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0034814814814794204
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.01137037037037203
-,0.0747037037036975
-,0.0
-,0.0
-,0.157555555555561
-,0.008592592592592041
-,0.01122222222222291
-,0.0007777777777775441
-,0.05562962962962814
-,0.04959259259258886
-,0.019000000000005457
-,0.0045925925925871525
-,0.4472592592592619
-,0.2798888888888911
-,0.09929629629629488
-,0.1637407407407423
-,0.0
-,0.0046666666666652645
-,0.0034444444444403644
-,0.0622592592592639
-,0.024333333333331097
-,0.018851851851849233
-,0.0
-,0.0
-,0.0627407407407432
-,0.03977777777777902
-,0.10537037037037322
-,0.0
-,0.0
-,0.22500000000000142
-,0.15459259259258573
-,0.008407407407403866
-,0.022481481481484877
-,0.005185185185190733
-,0.023703703703702672
-,0.02111111111111086
-,0.0
-,0.00022222222222012533
-,0.020740740740741614
-,0.03729629629629727
-,0.022888888888886072
-,0.10829629629630233
-,0.09455555555555861
-,0.11903703703703883
-,0.0
-,0.0
-,0.0
-,0.005444444444442809
-,0.019037037037037408
-,0.011518518518521148
-,0.006000000000000227
-,0.0012592592592568508
-,0.005148148148151677
-,0.03755555555555645
-,0.13144444444444048
-,0.05355555555555469
-,0.061666666666667425
-,0.03314814814815037
-,0.07762962962963371
-,0.04951851851851785
-,0.06277777777777516
-,0.09662962962963206
-,0.2111111111111157
-,0.022555555555555884
-,0.009370370370369585
-,0.0018518518518533256
-,0.0936666666666639
-,0.04281481481481819
-,0.015185185185188743
-,0.013259259259257306
-,0.012185185185181524
-,0.0011851851851858441
-,0.09311111111111359
-,0.0924444444444461
-,0.1382592592592573
-,0.017370370370372257
-,0.030000000000001137
-,0.04837037037037106
-,0.03525925925925577
-,0.14951851851851927
-,0.13611111111111285
-,0.04007407407407726
-,0.0040000000000048885
-,0.01859259259259005
-,0.050111111111114326
-,0.19755555555556015
-,0.07281481481481933
-,0.14748148148148488
-,0.002444444444442695
-,0.13922222222222302
-,0.0030000000000001137
-,0.03411111111110898
-,0.02733333333333121
-,0.1212592592592614
-,0.029740740740741956
-,0.06511111111110779
-,0.008222222222222797
-,0.01281481481480995
-,0.035629629629625015
-,0.019222222222218477
-,0.03248148148147578
-,0.0023333333333326323
-,0.0005555555555574188
-,0.014518518518521262
-,0.23203703703703837
-,0.044592592592593405
-,3.7037037031950604e-05
-,0.1921481481481493
-,0.0019629629629633882
-,0.13674074074074127
-,0.018148148148142695
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.005111111111105515
-,0.0022592592592616256
-,0.034851851851854576
-,0.012740740740746048
-,0.0
-,0.008370370370371916
-,0.0
-,0.017592592592592382
-,0.004185185185185958
-,0.0
-,0.0
-,0.07007407407407129
-,0.0933333333333266
-,0.018518518518519045
-,0.018777777777778226
-,0.12333333333332774
-,0.02040740740740432
-,0.03785185185185469
-,0.04685185185185503
-,0.17640740740741023
-,0.12648148148148408
-,0.04133333333333411
-,0.12740740740741074
-,0.010925925925924673
-,0.017259259259262194
-,0.00037037037036924403
-,0.0016666666666651508
-,0.14474074074073684
-,0.1387407407407366
-,0.023518518518521603
-,0.04840740740741012
-,0.04914814814814861
-,0.049037037037038544
-,0.1781481481481535
-,0.16518518518518732
-,0.0
-,0.02485185185184946
-,0.05377777777778192
-,0.011148148148151904
-,0.09792592592592797
-,0.0014814814814769761
-,0.04999999999999716
-,0.0035925925925965885
-,0.03907407407407959
-,0.04729629629630239
-,0.03714814814814815
-,0.04807407407407993
-,0.17629629629630017
-,0.0
-,0.08699999999999619
-,0.024518518518519272
-,0.04470370370370347
-,0.13718518518518863
-,0.017962962962961626
-,0.0804074074074066
-,0.04733333333333434
-,0.13637037037036492
-,0.07807407407407396
-,0.15970370370370546
-,0.06296296296296333
-,0.03977777777777902
-,0.05188888888888954
-,0.3405925925925928
-,0.006888888888887834
-,0.011592592592592155
-,0.11366666666666703
-,0.09192592592592774
-,0.04922222222222672
-,0.0015555555555550882
-,0.002888888888890051
-,0.017000000000003013
-,0.01925925925926464
-,0.01796296296296873
-,0.0010740740740757815
-,0.05174074074074042
-,0.04911111111110955
-,0.02162962962962922
-,0.010666666666665492
-,0.09862962962963451
-,0.054518518518513304
-,0.12088888888889215
-,0.07540740740741114
-,0.07540740740741114
-,0.038333333333333997
-,0.13314814814814468
-,0.0
-,0.08692592592593229
-,0.3299259259259202
-,0.07033333333333758
-,0.01940740740740665
-,0.07185185185185361
-,0.02177777777777834
-,0.051148148148143946
-,0.002111111111112507
-,0.0008518518518485507
-,0.005333333333332746
-,0.019666666666665833
-,0.0
-,0.14733333333333576
-,0.288333333333334
-,0.015962962962966287
-,0.012407407407408755
-,0.0
-,0.0458148148148112
-,0.0
-,0.0
-,0.04270370370370813
-,0.04218518518518266
-,0.2478888888888875
-,0.1255555555555503
-,0.0
-,0.0006296296296355308
-,0.47707407407407487
-,0.12077777777778209
-,0.0035185185185184764
-,0.2050000000000054
-,0.08325925925925759
-,0.22177777777777408
-,0.24366666666666958
-,0.2475555555555573
-,0.04777777777777459
-,0.008296296296293804
-,0.14807407407407425
-,0.1831851851851809
-,0.10281481481481336
-,0.12518518518518107
-,0.21511111111110637
-,0.06585185185185338
-,0.3013703703703712
-,0.0030370370370391697
-,0.05788888888888977
-,0.03185185185185446
-,0.05448148148148135
-,0.011185185185183855
-,0.04025925925925833
-,0.10640740740740995
-,0.02581481481481518
-,0.32881481481481245
-,0.07129629629629619
-,0.07574074074074133
-,0.15425925925926265
-,0.11085185185185509
-,0.0692592592592618
-,0.01981481481481495
-,0.1341111111111175
-,0.13448148148148675
-,0.0589999999999975
-,0.06174074074073843
-,0.11362962962962797
-,0.20696296296296168
-,0.09766666666666879
-,0.27362962962963167
-,0.15962962962962735
-,0.1259629629629586
-,0.22662962962963462
-,0.13355555555555298
-,0.029851851851852018
-,0.02666666666666373
-,0.07107407407407607
-,0.15459259259259284
-,0.08929629629629687
-,0.19281481481481677
-,0.021444444444441046
-,0.004518518518516146
-,0.11488888888889193
-,0.18940740740740836
-,0.03514814814814571
-,0.1795185185185204
-,0.3248888888888857
-,0.03866666666667129
-,0.05259259259259608
-,0.015074074074071575
-,0.13007407407407356
-,0.14207407407407402
-,0.02762962962962945
-,0.049740740740737976
-,0.18340740740740813
-,0.15555555555555856
-,0.10411111111110927
-,0.04081481481481575
-,0.026148148148145367
-,0.19911111111110813
-,0.1253333333333302
-,0.11696296296296538
-,0.2605185185185164
-,0.2268888888888938
-,0.0035555555555575324
-,0.009629629629628766
-,0.027148148148150142
-,0.06870370370370438
-,0.024222222222221035
-,0.12437037037037157
-,0.04792592592592371
-,0.0730000000000004
-,0.14737037037037481
-,0.09714814814815043
-,0.23296296296296504
-,0.022518518518523933
-,0.12233333333333718
-,0.0012962962962959068
-,0.017555555555553326
-,0.01770370370370955
-,0.014148148148144912
-,0.06492592592592672
-,0.0568888888888921
-,0.0920370370370307
-,0.0017037037037042069
-,0.008259259259254748
-,0.04670370370370591
-,0.001740740740743263
-,0.012444444444440705
-,0.05448148148148135
-,0.02203703703703752
-,0.005814814814812053
-,0.03118518518518698
-,0.11070370370370597
-,0.09199999999999875
-,0.0441111111111141
-,0.01888888888888829
-,0.0033703703703693577
-,0.005740740740741046
-,0.04759259259259352
-,0.12233333333333007
-,0.02092592592592979
-,0.01914814814814747
-,0.011296296296293917
-,0.05303703703703633
-,0.027370370370370267
-,0.19699999999999562
-,0.03151851851851717
-,0.1328888888888926
-,0.24162962962962808
-,0.26640740740740654
-,0.30529629629629795
-,0.11818518518518317
-,0.0816296296296315
-,0.0774814814814846
-,0.1545555555555609
-,0.10774074074074491
-,0.03522222222222382
-,0.1572962962962947
-,0.010592592592594485
-,0.08525925925926003
-,0.08322222222222564
-,0.019666666666665833
-,0.03162962962962723
-,0.12851851851851848
-,0.25303703703703917
-,0.5289999999999964
-,0.47807407407407254
-,0.828111111111113
-,0.41988888888889164
-,0.23733333333333206
-,0.18003703703703877
-,0.19118518518518357
-,0.15718518518518465
-,0.2592592592592595
-,0.14270370370370244
-,0.46896296296296214
-,0.45437037037036987
-,0.6656296296296347
-,0.6124074074074031
-,0.495703703703704
-,0.3904444444444479
-,0.2850740740740747
-,0.18777777777777516
-,0.3631111111111096
-,0.1589259259259279
-,0.09070370370370284
-,0.176111111111112
-,0.18133333333333468
-,0.02540740740740688
-,0.023148148148145253
-,0.08429629629630142
-,0.2391851851851854
-,0.07018518518518135
-,0.14992592592592757
-,0.16751851851851995
-,0.008666666666663048
-,0.05466666666666953
-,0.03488888888888653
-,0.09492592592592075
-,0.09962962962963218
-,0.17562962962962558
-,0.08055555555554861
-,0.02214814814815469
-,0.003370370370376463
-,0.035629629629625015
-,0.03940740740740267
-,0.06944444444444287
-,0.019185185185186526
-,0.009888888888887948
-,0.12307407407407567
-,0.04407407407407504
-,0.035851851851852246
-,0.048222222222221944
-,0.026851851851851904
-,0.04162962962962524
-,0.010703703703704548
-,0.01874074074073917
-,0.04644444444444673
-,0.054000000000002046
-,0.12862962962962854
-,0.025851851851854235
-,0.0486666666666693
-,0.15729629629630182
-,0.06203703703703667
-,0.005962962962961171
-,0.014740740740741387
-,0.1737407407407403
-,0.05522222222221984
-,0.061259259259259125
-,0.20544444444444565
-,0.04485185185185259
-,0.02733333333333121
-,0.12148148148148152
-,0.0821111111111108
-,0.11414814814814633
-,0.04588888888888931
-,0.3931481481481498
-,0.04455555555555435
-,0.03411111111110898
-,0.013592592592594599
-,0.014703703703709436
-,0.14374074074074628
-,0.007777777777782546
-,0.02022222222222325
-,0.03870370370370324
-,0.08077777777778294
-,0.08381481481481501
-,0.017407407407411313
-,0.05774074074074065
-,0.004814814814814383
-,0.03292592592592314
-,0.045592592592591075
-,0.0870740740740743
-,0.009111111111110404
-,0.1455925925925925
-,0.22903703703703826
-,0.0007777777777775441
-,0.07444444444444542
-,0.16196296296295998
-,0.1851481481481514
-,0.042148148148143605
-,0.08018518518518647
-,0.1513703703703726
-,0.022074074074069472
-,0.08200000000000074
-,0.08348148148148482
-,0.13592592592592467
-,0.041370370370373166
-,0.058629629629628255
-,0.13481481481480984
-,0.16937037037037328
-,0.06740740740740847
-,0.12114814814815134
-,0.022814814814815065
-,0.019074074074069358
-,0.036259259259260546
-,0.06433333333333735
-,0.008407407407403866
-,0.050296296296295395
-,0.13055555555555998
-,0.1556666666666615
-,0.019481481481477658
-,0.07851851851851421
-,0.07418518518518624
-,0.004185185185185958
-,0.025148148148147698
-,0.09411111111111126
-,0.10544444444445134
-,0.05107407407407294
-,0.004148148148146902
-,0.09881481481480847
-,0.014777777777780443
-,0.013888888888885731
-,0.06896296296296356
-,0.0012962962962959068
-,0.006296296296291359
-,0.012740740740746048
-,0.005222222222215578
-,0.0004444444444473561
-,0.037925925925925696
-,0.030888888888888744
-,0.13255555555555532
-,0.008629629629631097
-,0.016555555555555657
-,0.43151851851851575
-,0.0928518518518544
-,0.03096296296295975
-,0.026555555555553667
-,0.025037037037037635
-,0.07040740740740858
-,0.061296296296291075
-,0.0002962962962982374
-,0.10881481481481359
-,0.01140740740740398
-,0.06033333333333246
-,0.024925925925927572
-,0.027555555555551337
-,0.04140740740741222
-,0.00488888888888539
-,0.019111111111108414
-,0.03037037037037038
-,0.005888888888890165
-,0.07481481481481467
-,0.04474074074073542
-,0.08670370370369795
-,0.09477777777777874
-,0.00507407407408067
-,0.05488888888888255
-,0.061259259259259125
-,0.013074074074076236
-,0.030592592592590506
-,0.006703703703706765
-,0.06214814814814673
-,0.0017037037037042069
-,0.010888888888892723
-,0.05962962962963303
-,0.025592592592595054
-,0.004037037037036839
-,0.012777777777777999
-,0.042407407407402786
-,0.005777777777780102
-,0.05718518518518323
-,0.017185185185184082
-,0.015777777777778113
-,0.14366666666666816
-,0.025629629629627004
-,0.013962962962963843
-,0.05833333333333002
-,0.04648148148147868
-,0.10722222222221944
-,0.0857777777777784
-,0.0701481481481494
-,0.17522222222221728
-,0.07462962962962649
-,0.255703703703702
-,0.00833333333333286
-,0.07222222222222285
-,0.013407407407406424
-,0.23244444444444667
-,0.09425925925926038
-,0.09140740740740938
-,0.11188888888889181
-,0.11159259259259358
-,0.07611111111111057
-,0.006333333333337521
-,0.02140740740740199
-,0.0005185185185183627
-,0.00044444444444025066
-,0.035888888888884196
-,0.044000000000004036
-,0.03233333333333377
-,0.07181481481481455
-,0.041148148148145935
-,0.060851851851850824
-,0.02259259259259494
-,0.01525925925925975
-,0.04596296296296032
-,0.07666666666666799
-,0.010481481481477317
-,0.1782962962962955
-,0.0882222222222282
-,0.08529629629629198
-,0.06655555555555992
-,0.33451851851851444
-,3.703703703905603e-05
-,0.12837037037036936
-,0.1740740740740776
-,0.006925925925919785
-,0.20340740740741126
-,0.11770370370370387
-,0.09662962962963206
-,0.09274074074073724
-,0.029592592592592837
-,0.05881481481481643
-,0.041259259259263104
-,0.07492592592592473
-,0.008666666666670153
-,0.1258148148148166
-,0.0067777777777777715
-,0.022555555555555884
-,0.13059259259259193
-,0.09085185185185196
-,0.046999999999997044
-,0.14970370370370745
-,0.3344074074074044
-,0.20240740740740648
-,0.08603703703703758
-,0.0944814814814805
-,0.24944444444444258
-,0.0
-,0.12292592592592655
-,0.10137037037037544
-,0.09685185185185219
-,0.08940740740740694
-,0.09296296296295736
-,0.015407407407408868
-,0.063962962962961
-,0.0874074074074116
-,0.1332222222222228
-,0.037111111111109096
-,0.05225925925925878
-,0.00448148148147709
-,0.00448148148147709
-,0.05770370370370159
-,0.0548518518518506
-,0.05770370370370159
-,0.05770370370370159
-,0.037111111111109096
-,0.03759259259259551
-,0.10870370370370352
-,0.09807407407406998
-,0.012592592592589824
-,0.10292592592592342
-,0.014518518518521262
-,0.0861851851851867
-,0.0861851851851867
-,0.0014444444444450255
-,0.0014444444444450255
-,0.0
-,0.0
-,0.0008518518518485507
-,0.0008518518518485507
-,0.0
-,0.0
-,0.0
-,0.006259259259259409
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.58248148148148
-,0.1386666666666656
-,0.051518518518520295
-,0.0705555555555577
-,0.0008148148148094947
-,0.004481481481484195
-,0.0
-,0.0
-,0.0
-,0.02285185185185412
-,0.09125925925926026
-,0.0
-,0.06129629629629818
-,0.0022222222222225696
-,0.005814814814819158
-,0.0
-,0.0
-,0.007666666666665378
-,0.002444444444442695
-,0.007777777777775441
-,0.15203703703704008
-,0.0
-,0.0
-,0.0
-,0.0
-,0.24270370370370387
-,0.09307407407407453
-,0.0792592592592598
-,0.015999999999998238
-,0.010444444444445367
-,0.12340740740740586
-,0.03855555555555412
-,0.0
-,0.06825925925925702
-,0.0
-,0.0
-,0.03437037037037527
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.001074074074068676
-,0.0
-,0.0046296296296262085
-,0.19122222222222263
-,0.01899999999999835
-,0.08285185185184929
-,0.10307407407407254
-,0.07370370370369983
-,0.029333333333333655
-,0.038259259259255884
-,0.0
-,0.0
-,0.19911111111110813
-,0.051962962962960546
-,0.0
-,0.18511111111111234
-,0.0
-,0.0
-,0.0
-,0.0
-,0.0
-,0.007851851851853553
-,0.0
-,0.022407407407406765
-,0.0
-,0.0
-,0.0
-,0.0
-,0.17796296296296532
-,0.167555555555559
-,0.11085185185185509
-,0.09292592592592541
-,0.053148148148153496
-,0.011851851851851336
-,0.006370370370376577
-,0.0
-,0.0
-,0.004148148148154007
-,0.004148148148154007
-,0.0
-,0.0
-,0.02051851851852149
-,0.019074074074076464
-,3.7037037031950604e-05
-,3.7037037031950604e-05
-,0.268407407407409
-,0.17181481481481597
-,0.0
-,0.0006296296296355308
-,0.0012592592592639562
-,0.21148148148148493
-,0.0031111111111101764
-,0.0031111111111101764
-,0.44837037037036964
-,0.1117407407407427
-,0.03270370370371012
-,0.1575555555555539
-,0.010666666666665492
-,0.0
-,0.05355555555555469
-,0.07533333333333303
-,0.00022222222222012533
-,0.015185185185188743
-,0.0
-,0.030703703703707674
-,0.030703703703707674
-,0.0037777777777776578
-,0.01748148148148232
-,0.0
-,0.0
-,0.0030370370370320643
-,0.007814814814821602
-,0.0
-,0.0030370370370320643
-,0.0
-,0.0
-,0.030185185185182206
-,0.030185185185182206
-,0.20892592592592507
-,0.05203703703703866
-,0.14081481481481717
-,0.10503703703703593
-,0.10088888888888903
-,0.10533333333333417
-,0.03648148148148067
-,0.0
-,0.046222222222226605
-,0.0045925925925871525
-,0.0045925925925871525
-,0.0
-,0.04355555555555668
-,0.0
-,0.0
-,0.004148148148146902
-,0.042111111111111654
-,0.0
-,0.0
-,0.0
-,0.0013333333333349628
-,0.0
-,0.0035555555555575324
-,0.0017407407407361575
-,0.0
-,0.021037037037039852
-,0.17744444444444696
-,0.006407407407408527
-,0.08959259259259511
-,0.0021481481481444575
-,0.00025925925925918136
-,0.0
-,0.0034444444444474698
-,0.0808148148148149
-,0.011925925925929448
-,0.011925925925929448
-,0.011925925925929448
-,0.0023703703703716883
-,0.0023703703703716883
-,0.006851851851848778
-,0.01792592592592257
-,0.01792592592592257
-,0.0011481481481467881
-,0.03359259259259062
-,0.0
-,0.027407407407402218
-,0.08637037037037487
-,0.08518518518518903
-,0.0
-,0.0
-,0.12244444444444724
-,0.011074074074073792
-,0.0
-,0.13022222222222268
-,0.14581481481481262
-,0.014777777777780443
-,0.0
-,0.0387407407407423
-,0.00937037037037669
-,0.010370370370367255
-,0.0014814814814840815
-,0.0
-,0.0030370370370391697
-,0.0
-,0.0
-,0.0002962962962982374
-,0.005777777777772997
-,0.02540740740740688
-,0.025777777777776123
-,0.018222222222227913
-,0.016037037037037294
-,0.0
-,0.000333333333330188
-,0.026037037037035304
-,0.0
-,0.031407407407407106
-,0.049111111111116657
-,0.022999999999996135
-,0.07929629629629886
-,0.01870370370370722
-,0.029222222222223593
-,0.029222222222223593
-,0.01262962962962888
-,0.0
-,0.011925925925929448
-,0.011925925925929448
-,0.0
-,0.0034444444444474698
-,0.0
-,0.0
-,0.0
-,0.0
-,0.010222222222218136
-,0.010222222222218136
-]})
+import numpy as np
 
-anarray.plot()
+from baseline import QUANTILES, Baseline, baseline_path, build_baseline, find_anomalies
+from pyramid import MultiResolutionPlot
+from rescore import rescore
+from scorelog import load_scores, parse_time
+from segments import hourly_rates, segment_history
+
+
+def parse_floats(value):
+    return [float(part) for part in value.split(",")]
+
+
+def print_rescore(directory, cameras, start, end, zones, thresholds, releases, quiets, top):
+    for camera in cameras:
+        at, scores = load_scores(directory, camera, start, end, zones)
+        for zone, values in scores.items():
+            if not len(values):
+                continue
+            result = rescore(at, values, thresholds, releases, quiets)
+            print(f"{camera} {zone}: {len(values)} scores")
+            print(f"  {'threshold':>9} {'release':>7} {'quiet':>6} {'alerts':>7}")
+            for threshold, release, quiet, alerts in result.table()[:top]:
+                print(f"  {threshold:9.2f} {release:7.2f} {quiet:6.0f} {alerts:7}")
+
+
+def print_events(directory, cameras, start, end, zones, threshold, gap, min_duration, top):
+    for camera in cameras:
+        found = segment_history(directory, camera, start, end, threshold, gap, min_duration, zones)
+        for zone, events in found.items():
+            print(f"{camera} {zone}: {len(events)} events")
+            if not events:
+                continue
+            durations = np.array([event.duration for event in events])
+            print(f"  duration mean {durations.mean():.1f}s max {durations.max():.1f}s")
+            print("  biggest:")
+            for event in sorted(events, key=lambda event: event.area, reverse=True)[:top]:
+                print(f"    {event.describe()}")
+            print("  per hour:")
+            for hour, count in zip(*hourly_rates(events, start, end)):
+                print(f"    {datetime.fromtimestamp(hour):%Y-%m-%d %H:%M} {count:5}")
+
+
+def update_baseline(directory, cameras, start, end, zones):
+    for camera in cameras:
+        baseline = build_baseline(directory, camera, start, end, zones)
+        path = baseline_path(directory, camera)
+        baseline.save(path)
+        for zone in sorted(baseline.histograms):
+            minutes = baseline.minutes(zone)
+            print(f"{camera} {zone}: {minutes.sum()} minutes, {(minutes > 0).sum()} of the"
+                  f" {len(minutes)} hours of the week")
+        print(f"Saved {path}")
+
+
+def print_anomalies(directory, cameras, start, end, zones, quantile, floor):
+    for camera in cameras:
+        path = baseline_path(directory, camera)
+        if not os.path.exists(path):
+            print(f"No baseline of {camera}, make it with --build-baseline")
+            continue
+        baseline = Baseline.load(path)
+        anomalies = find_anomalies(baseline, directory, camera, start, end, quantile, floor, zones)
+        print(f"{camera}: {len(anomalies)} unusual periods (baseline"
+              f" {datetime.fromtimestamp(baseline.start):%Y-%m-%d}"
+              f" to {datetime.fromtimestamp(baseline.end):%Y-%m-%d})")
+        for anomaly in anomalies:
+            print(f"  {anomaly.describe()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plot the motion scores of a camera")
+    parser.add_argument("directory", help="the --scores directory of ringring.py")
+    parser.add_argument("--camera", action="append",
+                        help="camera to show, can be repeated (default: cam1)")
+    parser.add_argument("--zone", action="append", help="zone to plot, can be repeated"
+                                                        " (default: all)")
+    parser.add_argument("--start", type=parse_time, help="YYYY-MM-DD [HH:MM] (default: a day ago)")
+    parser.add_argument("--end", type=parse_time, help="YYYY-MM-DD [HH:MM] (default: now)")
+    parser.add_argument("--rescore", action="store_true",
+                        help="count the alerts of every setting instead of plotting")
+    parser.add_argument("--thresholds", type=parse_floats, default=[0.3, 0.6, 1, 2, 5],
+                        help="comma separated (default: 0.3,0.6,1,2,5)")
+    parser.add_argument("--releases", type=parse_floats, default=[1, 0.5],
+                        help="hysteresis, fractions of the threshold (default: 1,0.5)")
+    parser.add_argument("--quiets", type=parse_floats, default=[0, 30, 120],
+                        help="debounce seconds (default: 0,30,120)")
+    parser.add_argument("--points", type=int, default=2000,
+                        help="most bins drawn per zone before a coarser level is used"
+                             " (default: 2000)")
+    parser.add_argument("--events", action="store_true",
+                        help="list the bursts of motion and the events per hour instead of"
+                             " plotting")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="score a frame is in motion over, for --events (default: 0.1)")
+    parser.add_argument("--gap", type=float, default=2,
+                        help="still seconds that end an event, for --events (default: 2)")
+    parser.add_argument("--min-duration", type=float, default=0,
+                        help="shorter events are ignored, for --events (default: 0)")
+    parser.add_argument("--build-baseline", action="store_true",
+                        help="learn the usual activity of every hour of the week from --start to"
+                             " --end (default: the last 8 weeks) into DIRECTORY/baseline/")
+    parser.add_argument("--anomalies", action="store_true",
+                        help="list the periods busier than the baseline expects for their hour"
+                             " of the week")
+    parser.add_argument("--quantile", type=float, choices=QUANTILES, default=0.99,
+                        help="activity over this quantile of its hour is unusual (default: 0.99)")
+    parser.add_argument("--floor", type=float, default=0.01,
+                        help="mean score of a minute that is never unusual, however quiet its"
+                             " hour is (default: 0.01)")
+    parser.add_argument("--top", type=int, default=20,
+                        help="settings or biggest events shown per zone (default: 20)")
+    args = parser.parse_args()
+    end = args.end or time.time()
+    start = args.start or end - 24 * 3600
+    cameras = args.camera or ["cam1"]
+
+    if args.build_baseline:
+        update_baseline(args.directory, cameras, args.start or end - 8 * 7 * 24 * 3600, end,
+                        args.zone)
+        return
+    if args.anomalies:
+        print_anomalies(args.directory, cameras, start, end, args.zone, args.quantile, args.floor)
+        return
+
+    if args.rescore:
+        print_rescore(args.directory, cameras, start, end, args.zone, args.thresholds,
+                      args.releases, args.quiets, args.top)
+        return
+    if args.events:
+        print_events(args.directory, cameras, start, end, args.zone, args.threshold, args.gap,
+                     args.min_duration, args.top)
+        return
+    import matplotlib.pyplot as plt
+    for camera in cameras:
+        fig, ax = plt.subplots()
+        ax.set_title(camera)
+        plot = MultiResolutionPlot(ax, args.directory, camera, args.zone, args.points)
+        plot.show(start, end)
+        if not plot.artists:
+            print(f"No scores of {camera} in that time")
+            plt.close(fig)
+    plt.show()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+# Min/max/mean summaries of the score columns (scorelog.py) for plotting
+# long histories with motioncam1.py.
+# A day of one camera at 25 fps is two million scores per zone, matplotlib
+# can't draw a month of that.  Every camera-day folder gets a pyramid.npz
+# with the min, max, sum and count of every zone per minute of the day, the
+# hour and day levels are folded from the minutes when asked for.  The
+# pyramid remembers how many rows of the columns it has seen, update() only
+# reads the rows that came after, so a day that is still being written costs
+# the new scores, not the whole day again.
+#
+# MultiResolutionPlot draws the level that fits the visible range (the raw
+# scores when zoomed in to minutes, minutes, hours or days further out) as a
+# min-max band with the mean on top, and redraws it when the range changes.
+import os
+from datetime import datetime
+
+import numpy as np
+
+from scorelog import SCORE_DTYPE, camera_folder, days_between, load_scores, open_day
+
+PYRAMID_FILE = "pyramid.npz"
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+# Minutes of the longest day, the one the clocks go back
+MINUTES = 25 * 60
+LEVELS = (MINUTE, HOUR, DAY)
+# Rows read at a time when catching up
+CHUNK = 1 << 20
+
+
+class Pyramid:
+    """The minute summaries of one camera on one day."""
+
+    def __init__(self, directory, camera, day):
+        self.directory = directory
+        self.camera = camera
+        self.day = day
+        self.path = os.path.join(camera_folder(directory, day, camera), PYRAMID_FILE)
+        self.rows = 0
+        # {zone: {"min"|"max"|"sum"|"count": array of MINUTES}}
+        self.zones = {}
+        if os.path.exists(self.path):
+            with np.load(self.path) as saved:
+                self.rows = int(saved["rows"])
+                for key in saved.files:
+                    if key != "rows":
+                        zone, field = key.rsplit(".", 1)
+                        self.zones.setdefault(zone, {})[field] = saved[key]
+
+    def zone(self, name):
+        summary = self.zones.get(name)
+        if summary is None:
+            summary = self.zones[name] = {
+                "min": np.full(MINUTES, np.inf, dtype=SCORE_DTYPE),
+                "max": np.full(MINUTES, -np.inf, dtype=SCORE_DTYPE),
+                "sum": np.zeros(MINUTES),
+                "count": np.zeros(MINUTES, dtype=np.uint32),
+            }
+        return summary
+
+    def update(self):
+        """Folds in the rows written since the last update, saves the pyramid
+        if there were any.  Returns self."""
+        mapped = open_day(self.directory, self.camera, self.day)
+        if mapped is None or len(mapped[1]) <= self.rows:
+            return self
+        midnight, times, columns = mapped
+        total = len(times)
+        for start in range(self.rows, total, CHUNK):
+            minutes = np.asarray(times[start:start + CHUNK]) // (MINUTE * 1000)
+            minutes = np.minimum(minutes, MINUTES - 1).astype(np.intp)
+            # The times only grow, so each minute is one run of rows
+            edges = np.concatenate(([0], np.flatnonzero(np.diff(minutes)) + 1))
+            bins = minutes[edges]
+            for name, column in columns.items():
+                values = np.asarray(column[start:start + CHUNK])
+                valid = ~np.isnan(values)
+                summary = self.zone(name)
+                # bins has no repeats, plain indexing folds them in
+                lows = np.minimum.reduceat(np.where(valid, values, np.inf), edges)
+                summary["min"][bins] = np.minimum(summary["min"][bins], lows)
+                highs = np.maximum.reduceat(np.where(valid, values, -np.inf), edges)
+                summary["max"][bins] = np.maximum(summary["max"][bins], highs)
+                summary["sum"][bins] += np.add.reduceat(np.where(valid, values, 0.0), edges)
+                summary["count"][bins] += np.add.reduceat(valid.astype(np.uint32), edges)
+        self.rows = total
+        self.save()
+        return self
+
+    def save(self):
+        arrays = {"rows": np.array(self.rows)}
+        for name, summary in self.zones.items():
+            for field, values in summary.items():
+                arrays[f"{name}.{field}"] = values
+        # Readers may be loading it, replace it in one go
+        temporary = self.path + ".tmp.npz"
+        np.savez(temporary, **arrays)
+        os.replace(temporary, self.path)
+
+    def level(self, name, width):
+        """Returns (seconds since midnight of each bin, min, max, mean) of zone
+        name in bins of width seconds (one of LEVELS), only the bins with
+        scores."""
+        summary = self.zones.get(name)
+        if summary is None:
+            return np.empty(0), np.empty(0), np.empty(0), np.empty(0)
+        per = width // MINUTE
+        shape = (-1, per) if width < DAY else (1, -1)
+        count = summary["count"].reshape(shape).sum(axis=1)
+        low = summary["min"].reshape(shape).min(axis=1)
+        high = summary["max"].reshape(shape).max(axis=1)
+        total = summary["sum"].reshape(shape).sum(axis=1)
+        kept = count > 0
+        starts = np.arange(len(count)) * width
+        return starts[kept], low[kept], high[kept], total[kept] / count[kept]
+
+
+def choose_level(span, max_points=2000, raw_span=600):
+    """Bin width in seconds to draw span seconds with, None for the raw scores."""
+    if span <= raw_span:
+        return None
+    for width in LEVELS:
+        if span / width <= max_points:
+            return width
+    return DAY
+
+
+def load_level(directory, camera, start, end, width, zones=None):
+    """Returns {zone: (unix time of each bin, min, max, mean)} of camera
+    between the unix times start and end, updating the pyramids it reads."""
+    values = {}
+    for day in days_between(start, end):
+        if not os.path.isdir(camera_folder(directory, day, camera)):
+            continue
+        pyramid = Pyramid(directory, camera, day).update()
+        midnight = datetime(day.year, day.month, day.day).timestamp()
+        names = zones if zones is not None else sorted(pyramid.zones)
+        for name in names:
+            offsets, low, high, mean = pyramid.level(name, width)
+            at = midnight + offsets
+            keep = (at + width > start) & (at < end)
+            values.setdefault(name, []).append((at[keep], low[keep], high[keep], mean[keep]))
+    result = {}
+    for name, parts in values.items():
+        result[name] = tuple(np.concatenate([part[i] for part in parts]) for i in range(4))
+    return result
+
+
+def to_num(timestamp):
+    """Matplotlib date of a unix time.  The axis shows local times, date2num
+    takes naive datetimes as UTC, so they go in and out naive local."""
+    import matplotlib.dates as mdates
+    return mdates.date2num(datetime.fromtimestamp(timestamp))
+
+
+def from_num(number):
+    """Unix time of a matplotlib date of to_num()."""
+    import matplotlib.dates as mdates
+    return mdates.num2date(number).replace(tzinfo=None).timestamp()
+
+
+class MultiResolutionPlot:
+    """Scores of the zones of a camera on a matplotlib axes, at the level of
+    detail of whatever range it shows."""
+
+    def __init__(self, ax, directory, camera, zones=None, max_points=2000):
+        self.ax = ax
+        self.directory = directory
+        self.camera = camera
+        self.zones = zones
+        self.max_points = max_points
+        self.artists = []
+        self.shown = None
+        self.drawing = False
+
+    def show(self, start, end):
+        import matplotlib.dates as mdates
+        self.draw(start, end)
+        self.ax.set_xlim(to_num(start), to_num(end))
+        locator = self.ax.xaxis.get_major_locator()
+        self.ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+        self.ax.callbacks.connect("xlim_changed", self.on_xlim)
+
+    def on_xlim(self, ax):
+        if self.drawing:
+            return
+        low, high = ax.get_xlim()
+        self.draw(from_num(low), from_num(high))
+        ax.figure.canvas.draw_idle()
+
+    def draw(self, start, end):
+        width = choose_level(end - start, self.max_points)
+        # A range inside the one already drawn at the same level needs nothing new
+        if self.shown is not None and self.shown[0] == width and \
+                self.shown[1] <= start and end <= self.shown[2]:
+            return
+        # Draw a bit more than what is visible so panning doesn't redraw at once
+        margin = (end - start) / 2
+        start, end = start - margin, end + margin
+        self.drawing = True
+        try:
+            for artist in self.artists:
+                artist.remove()
+            self.artists = []
+            if width is None:
+                at, scores = load_scores(self.directory, self.camera, start, end, self.zones)
+                dates = [to_num(t) for t in at]
+                for name, values in scores.items():
+                    self.artists += self.ax.plot(dates, values, label=name, linewidth=0.8)
+            else:
+                for name, (at, low, high, mean) in load_level(self.directory, self.camera, start,
+                                                              end, width, self.zones).items():
+                    # Bins drawn at their middle
+                    dates = [to_num(t + width / 2) for t in at]
+                    line, = self.ax.plot(dates, mean, label=f"{name} mean", linewidth=0.8)
+                    self.artists.append(line)
+                    self.artists.append(self.ax.fill_between(dates, low, high, alpha=0.25,
+                                                             color=line.get_color(), linewidth=0))
+            self.ax.set_ylabel("score" if width is None else
+                               f"score per {({MINUTE: 'minute', HOUR: 'hour', DAY: 'day'})[width]}")
+            if self.artists:
+                self.ax.legend(loc="upper right")
+            self.shown = (width, start, end)
+        finally:
+            self.drawing = False
@@ -0,0 +1,137 @@
+# Event recorder for ringring.py
+# Every camera keeps the last pre_seconds of frames in memory.  When motion
+# triggers, those frames plus everything until post_seconds after the last
+# trigger are written into one clip, a new trigger while recording just
+# extends the clip so overlapping events end up in the same file.
+# The encoding runs in a writer thread per camera, the capture thread only
+# appends to a deque and a queue so it never waits for the disk.
+#
+# Frames are kept decoded, a 1920x1080 frame is ~6MB so 3 seconds at 25fps
+# is ~450MB per camera, keep pre_seconds short or record the substream.
+# With a frame pool (framepool.py) the pre-roll holds pool slots, so the pool
+# needs at least pre_seconds * fps slots plus a few for the rest.
+import collections
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import cv2
+
+
+class ClipWriter(threading.Thread):
+    """Writes the frames it gets on its queue, an ("open", path, fps) item
+    starts a new clip and None closes it."""
+
+    def __init__(self, name, fourcc="mp4v", max_queue=500):
+        super().__init__(name=f"recorder-{name}", daemon=True)
+        # Unbounded so open/close items always go in without waiting, and in
+        # order with the frames, the frames themselves stop at max_queue
+        self.queue = queue.Queue()
+        self.max_queue = max_queue
+        self.fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        self.writer = None
+        self.path = None
+        self.fps = 0
+        self.dropped = 0
+
+    def put(self, frame):
+        """Never blocks, if the disk can't keep up the frame is lost."""
+        if self.queue.qsize() >= self.max_queue:
+            self.dropped += 1
+        else:
+            self.queue.put_nowait(frame)
+
+    def control(self, item):
+        """Open/close items are never dropped and never block."""
+        self.queue.put_nowait(item)
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.close()
+            elif isinstance(item, tuple) and item[0] == "open":
+                self.close()
+                _, self.path, self.fps = item
+            elif item is StopIteration:
+                self.close()
+                return
+            else:
+                if self.writer is None and self.path is not None:
+                    height, width = item.shape[:2]
+                    self.writer = cv2.VideoWriter(self.path, self.fourcc, self.fps, (width, height))
+                if self.writer is not None:
+                    self.writer.write(item)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.release()
+            print(f"Saved {self.path}")
+        self.writer = None
+        self.path = None
+
+
+class EventRecorder:
+    """Pre-roll ring buffer plus trigger logic of one camera."""
+
+    def __init__(self, name, directory, pre_seconds=3, post_seconds=5, fourcc="mp4v"):
+        self.name = name
+        self.directory = directory
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.frames = collections.deque()
+        self.lock = threading.Lock()
+        # Frames are written until this time.monotonic(), 0 when not recording
+        self.record_until = 0
+        self.events = 0
+        self.writer = ClipWriter(name, fourcc)
+        self.writer.start()
+
+    def add(self, frame, decoded_at, slot=None, seq=None):
+        """Called with every decoded frame, from the capture thread.  While
+        a frame is kept here its slot of the frame pool stays taken."""
+        with self.lock:
+            if self.record_until:
+                if decoded_at <= self.record_until:
+                    self.writer.put(frame)
+                    return
+                self.writer.control(None)
+                self.record_until = 0
+            self.frames.append((decoded_at, frame))
+            while self.frames and self.frames[0][0] < decoded_at - self.pre_seconds:
+                self.frames.popleft()
+
+    def trigger(self, now=None):
+        """Starts a clip with the pre-roll, or extends the current one."""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if self.record_until:
+                self.record_until = max(self.record_until, now + self.post_seconds)
+                return
+            self.record_until = now + self.post_seconds
+            self.events += 1
+            os.makedirs(self.directory, exist_ok=True)
+            # With a short --post-roll two clips can start in the same second,
+            # the milliseconds and the event number keep them apart
+            when = datetime.now()
+            stamp = f"{when:%Y%m%d-%H%M%S}-{when.microsecond // 1000:03}"
+            path = os.path.join(self.directory, f"{self.name}-{stamp}-{self.events}.mp4")
+            self.writer.control(("open", path, self.estimate_fps()))
+            for decoded_at, frame in self.frames:
+                self.writer.put(frame)
+            self.frames.clear()
+
+    def estimate_fps(self, default=25.0):
+        """Frames/second of the stream, from the times of the pre-roll frames."""
+        if len(self.frames) < 2:
+            return default
+        elapsed = self.frames[-1][0] - self.frames[0][0]
+        return (len(self.frames) - 1) / elapsed if elapsed > 0 else default
+
+    def close(self):
+        with self.lock:
+            self.record_until = 0
+        self.writer.queue.put(StopIteration)
+        self.writer.join(timeout=10)
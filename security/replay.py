@@ -0,0 +1,163 @@
+# Replay sources for ringring.py, to run the pipeline without a camera.
+# Anything that is not a camera url can be a camera too:
+#   clip.mp4                  a recorded file, as fast as it decodes
+#   synthetic://?seconds=60   generated frames, see SyntheticCapture
+# With --realtime the frames are handed out at the pace of the video
+# (PacedCapture) instead of as fast as possible.
+#
+# Ground truth files are csv lines of start,end seconds of the video when
+# there is motion in the zones, '#' lines are comments.
+import time
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+import numpy as np
+
+
+class SyntheticCapture:
+    """Looks like a cv2.VideoCapture.  A noisy still background where every
+    `period` seconds a box crosses the frame from left to right in
+    `duration` seconds, at the height of the default zones."""
+
+    def __init__(self, width=1920, height=1080, fps=25, seconds=60, period=10, duration=3,
+                 noise=3, box=(120, 260), top=230, seed=1):
+        self.width, self.height = width, height
+        self.fps = fps
+        self.frames = int(seconds * fps)
+        self.period = period
+        self.duration = duration
+        self.box = box
+        self.top = top
+        rng = np.random.default_rng(seed)
+        background = rng.integers(40, 200, (height // 8, width // 8, 3), dtype=np.uint8)
+        background = cv2.resize(background, (width, height), interpolation=cv2.INTER_LINEAR)
+        # A few noisy versions of the background, cycled, making noise for
+        # every frame would cost more than what we want to measure
+        self.backgrounds = []
+        for _ in range(4):
+            grain = rng.normal(0, noise, background.shape)
+            self.backgrounds.append(np.clip(background + grain, 0, 255).astype(np.uint8))
+        self.index = 0
+        self.opened = True
+
+    @classmethod
+    def from_url(cls, url):
+        """synthetic://?width=1920&height=1080&fps=25&seconds=60&period=10&duration=3&noise=3"""
+        query = {key: values[-1] for key, values in parse_qs(urlparse(url).query).items()}
+        kwargs = {key: float(value) if "." in value else int(value) for key, value in query.items()}
+        return cls(**kwargs)
+
+    def box_at(self, index):
+        """Returns the (x0, y0, x1, y1) of the box in frame index, or None."""
+        t = index / self.fps
+        start = (t // self.period) * self.period
+        if t - start >= self.duration:
+            return None
+        box_width, box_height = self.box
+        x0 = int((t - start) / self.duration * (self.width + box_width)) - box_width
+        return x0, self.top, x0 + box_width, self.top + box_height
+
+    def truth(self, zones):
+        """Returns the (start, end) seconds when the box is over any of the
+        zones (given in the coordinates of this video)."""
+        intervals = []
+        current = None
+        for index in range(self.frames):
+            box = self.box_at(index)
+            inside = box is not None and any(
+                box[0] < zone.roi.x1 and zone.roi.x0 < box[2] and
+                box[1] < zone.roi.y1 and zone.roi.y0 < box[3] for zone in zones)
+            t = index / self.fps
+            if inside and current is None:
+                current = t
+            elif not inside and current is not None:
+                intervals.append((current, t))
+                current = None
+        if current is not None:
+            intervals.append((current, self.frames / self.fps))
+        return intervals
+
+    def isOpened(self):
+        return self.opened
+
+    def grab(self):
+        if not self.opened or self.index >= self.frames:
+            return False
+        self.index += 1
+        return True
+
+    def retrieve(self, image=None, flag=0):
+        index = self.index - 1
+        if image is None or image.shape != (self.height, self.width, 3):
+            image = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        np.copyto(image, self.backgrounds[index % len(self.backgrounds)])
+        box = self.box_at(index)
+        if box is not None:
+            cv2.rectangle(image, box[:2], box[2:], (230, 230, 230), -1)
+        return True, image
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.frames)
+        return 0.0
+
+    def release(self):
+        self.opened = False
+
+
+class PacedCapture:
+    """Wraps a capture, pace() sleeps until the next frame is due by the
+    video's own clock.  It is kept out of grab() so the sleep doesn't count
+    as decode time."""
+
+    def __init__(self, cap, fps=None):
+        self.cap = cap
+        fps = fps or cap.get(cv2.CAP_PROP_FPS) or 25
+        self.interval = 1 / fps
+        self.next = None
+
+    def pace(self):
+        now = time.monotonic()
+        if self.next is None:
+            self.next = now
+        elif now < self.next:
+            time.sleep(self.next - now)
+        self.next += self.interval
+
+    def __getattr__(self, name):
+        return getattr(self.cap, name)
+
+
+def open_replay(url, realtime=False):
+    """Returns a capture for a synthetic:// url or None for anything else."""
+    if not url.startswith("synthetic:"):
+        return None
+    cap = SyntheticCapture.from_url(url)
+    return PacedCapture(cap) if realtime else cap
+
+
+def load_truth(path):
+    """Reads a ground truth file into a list of (start, end) seconds."""
+    intervals = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            start, end = line.split(",")[:2]
+            intervals.append((float(start), float(end)))
+    return intervals
+
+
+def write_truth(path, intervals):
+    with open(path, "w") as f:
+        f.write("# start,end seconds with motion in the zones\n")
+        for start, end in intervals:
+            f.write(f"{start:.3f},{end:.3f}\n")
@@ -0,0 +1,142 @@
+# Replays a score history (scorelog.py) through many alert settings at once,
+# to pick the threshold, hysteresis and debounce of a zone without replaying
+# any video.  A setting is
+#   threshold - the zone is in motion when the score goes over it
+#   release   - hysteresis: it stays in motion until the score drops under
+#               threshold * release (1 is no hysteresis)
+#   quiet     - debounce: a frame in motion alerts if the zone had no motion
+#               for quiet seconds before it, like events.Debouncer
+# and every setting gets its number of alerts and their times.
+#
+# The on/off state with hysteresis looks like a loop over the samples, but a
+# sample is in motion exactly when the last score over the threshold came
+# after the last score under the release, and "the last index where" is a
+# np.maximum.accumulate.  So all the (threshold, release) pairs are evaluated
+# together as rows of 2D arrays, the quiet values on top of them, going
+# through the history in chunks whose carry is those "last" indexes, so
+# memory stays bounded with months of samples.
+#
+#   python rescore.py     checks rescore() against rescore_loop()
+import argparse
+import itertools
+
+import numpy as np
+
+
+class Rescore:
+    """Results of rescore(): configs is a list of (threshold, release, quiet),
+    counts the alerts of each and alerts the unix times of them."""
+
+    def __init__(self, configs, counts, alerts):
+        self.configs = configs
+        self.counts = counts
+        self.alerts = alerts
+
+    def table(self):
+        """(threshold, release, quiet, alerts) rows, fewest alerts first."""
+        order = np.argsort(self.counts, kind="stable")
+        return [(*self.configs[i], int(self.counts[i])) for i in order]
+
+    def hourly(self, index):
+        """Alerts of config index per hour, as a {hour start: count} dict."""
+        hours = (self.alerts[index] // 3600).astype(np.int64)
+        values, counts = np.unique(hours, return_counts=True)
+        return {int(hour) * 3600: int(count) for hour, count in zip(values, counts)}
+
+
+def rescore(times, scores, thresholds, releases=(1.0,), quiets=(30.0,), budget=64 * 2 ** 20):
+    """Alerts of every combination of thresholds x releases x quiets over the
+    scores of one zone (times in seconds, increasing).  budget is about the
+    bytes of the arrays of one chunk."""
+    times = np.asarray(times, dtype=np.float64)
+    scores = np.asarray(scores, dtype=np.float32)
+    pairs = list(itertools.product(thresholds, releases))
+    on = np.array([threshold for threshold, release in pairs], dtype=np.float32)[:, None]
+    off = np.array([threshold * release for threshold, release in pairs], dtype=np.float32)[:, None]
+    quiets = np.asarray(quiets, dtype=np.float64)
+    rows = len(pairs)
+    # Five 8 byte arrays of rows x chunk are alive at once
+    chunk = max(1024, budget // (rows * 8 * 5))
+
+    # Carry between chunks, per row: last index over the threshold, last
+    # index under the release, time of the last sample in motion
+    last_on = np.full((rows, 1), -1, dtype=np.int64)
+    last_off = np.full((rows, 1), -1, dtype=np.int64)
+    last_moving = np.full((rows, 1), -np.inf)
+    found = [[[] for _ in quiets] for _ in range(rows)]
+    for start in range(0, len(scores), chunk):
+        t = times[start:start + chunk]
+        s = scores[start:start + chunk]
+        index = np.arange(start, start + len(s), dtype=np.int64)
+        ons = np.maximum.accumulate(np.where(s > on, index, -1), axis=1)
+        np.maximum(ons, last_on, out=ons)
+        offs = np.maximum.accumulate(np.where(s < off, index, -1), axis=1)
+        np.maximum(offs, last_off, out=offs)
+        moving = ons > offs
+        # Time of the sample in motion before each sample
+        seen = np.maximum.accumulate(np.where(moving, t, -np.inf), axis=1)
+        np.maximum(seen, last_moving, out=seen)
+        before = np.empty_like(seen)
+        before[:, 0] = last_moving[:, 0]
+        before[:, 1:] = seen[:, :-1]
+        gap = t - before
+        for q, quiet in enumerate(quiets):
+            row, column = np.nonzero(moving & (gap > quiet))
+            for r in np.unique(row):
+                found[r][q].append(t[column[row == r]])
+        last_on = ons[:, -1:]
+        last_off = offs[:, -1:]
+        last_moving = seen[:, -1:]
+
+    configs, counts, alerts = [], [], []
+    for r, (threshold, release) in enumerate(pairs):
+        for q, quiet in enumerate(quiets):
+            at = np.concatenate(found[r][q]) if found[r][q] else np.empty(0)
+            configs.append((threshold, release, float(quiet)))
+            counts.append(len(at))
+            alerts.append(at)
+    return Rescore(configs, np.array(counts), alerts)
+
+
+def rescore_loop(times, scores, threshold, release=1.0, quiet=30.0):
+    """The same as one config of rescore(), a sample at a time, to check it."""
+    moving = False
+    last_moving = None
+    alerts = []
+    for t, s in zip(times, scores):
+        moving = s >= threshold * release if moving else s > threshold
+        if moving:
+            if last_moving is None or t - last_moving > quiet:
+                alerts.append(t)
+            last_moving = t
+    return np.array(alerts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check rescore() against rescore_loop()")
+    parser.add_argument("--samples", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+    times = np.cumsum(rng.uniform(0.02, 0.06, args.samples))
+    # Noise with bursts of motion, and scores right on the thresholds
+    scores = rng.uniform(0, 0.4, args.samples).astype(np.float32)
+    for start in rng.integers(0, args.samples - 100, args.samples // 500):
+        scores[start:start + rng.integers(1, 100)] += rng.uniform(0.5, 3)
+    scores[rng.integers(0, args.samples, 100)] = 1.0
+    thresholds, releases, quiets = (0.5, 1, 2), (1.0, 0.5), (0.0, 1.0, 30.0)
+    # A small budget so the carry between chunks is checked too
+    result = rescore(times, scores, thresholds, releases, quiets, budget=2 ** 20)
+    failed = 0
+    for (threshold, release, quiet), alerts in zip(result.configs, result.alerts):
+        expected = rescore_loop(times, scores, np.float32(threshold), np.float32(release), quiet)
+        if not np.array_equal(alerts, expected):
+            failed += 1
+            print(f"threshold {threshold} release {release} quiet {quiet}: {len(alerts)}"
+                  f" alerts, the loop gives {len(expected)}")
+    print(f"{len(result.configs) - failed} of {len(result.configs)} settings agree")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
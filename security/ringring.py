@@ -3,113 +3,461 @@
 # my new cameras.  The system is nice but as usual i find things it can not do and i thought that it
 # would be great idea to implement it.  But which is that idea ?
 #
+import argparse
+import os
+import time
+
 import cv2
 import numpy as np
 
+from analysis import DEFAULT_ZONES, CameraState, analyze
+from capture import CaptureEngine, set_ffmpeg_options
+from detectors import DETECTORS
+from events import Debouncer, EventBus, MotionEvent, TelegramNotifier
+from metrics import Metrics, MetricsServer
+from mosaic import Mosaic
+from recorder import EventRecorder
+from scorelog import ScoreLogger
+from segments import Segmenter
+from snapshots import SnapshotStore
+from workers import AnalysisPool
+from zones import load_zones, parse_size, substream_url
+
 # RTSP URL
 rtsp_url1 = "rtsp://<user>:<password>@<IP>:554/cam/realmonitor?channel=1&subtype=0"
+#rtsp_url2 = "rtsp://<user>:<password>@<IP>:554/cam/realmonitor?channel=2&subtype=0"
+
+# Cameras watched when none is given in the command line
+CAMERAS = {
+    "cam1": rtsp_url1,
+    #"cam2": rtsp_url2,
+}
 
 # font
 font = cv2.FONT_HERSHEY_SIMPLEX
-# org
-org = (200, 400)
 # fontScale
 fontScale = 1
 # Blue color in BGR
 color = (255, 0, 0)
 # Line thickness of 2 px
 thickness = 2
-result = 0
-# Open the RTSP stream
-cap1 = cv2.VideoCapture(rtsp_url1)
-#cap2 = cv2.VideoCapture(rtsp_url2)
-if not cap1.isOpened():
-    print("Cannot open RTSP stream 1")
-    exit(-1)
-
-#if not cap2.isOpened():
-#    print("Cannot open RTSP stream 2")
-#    exit(-1)
-last_mean = 0
-first_pass = True
-counter = 0
-
-while True:
-    # Read a frame from the stream
-    ret1, frame1 = cap1.read()
-    # Read a frame from the stream
-    #ret2, frame2 = cap2.read()
-
-    # If frame is read correctly ret is True
-    if not ret1:
-        print("Can't receive frame (stream end?). Exiting ...")
-        break
-    # If frame is read correctly ret is True
-    #if not ret2:
-    #    print("Can't receive frame (stream end?). Exiting ...")
-    #    break
-
-    cv2.namedWindow("Frame1", cv2.WINDOW_NORMAL) 
-    cv2.resizeWindow("Frame1", 650, 450)
-
-    # Display the resulting frame
-    #cv2.imshow('Frame1', frame1)
-    # Convert the frame to Gray Scale
-    gray = cv2.cvtColor(frame1, cv2.COLOR_BGR2GRAY)
-
-    # Timbre area:
-    #crop_img = gray[230:500, 500:600]
-    # Calle area:
-    # Crop the image using slicing
-    #[y_start:y_end, x_start:x_end]
-    crop_img = gray[230:500, 200:400]
-    if result > 0.6:
-        # Timbre
-        #cv2.rectangle(frame1, (500, 200), (600, 500), (2, 2, 255), 3)
-        # Calle
-        cv2.rectangle(frame1, (200, 230), (400, 500), (2, 2, 255), 3)
-        frame1 = cv2.putText(frame1, 'Motion Detected!!', org, font, 
-                   fontScale, color, thickness, cv2.LINE_AA)
-    else:
-        # Timbre
-        #cv2.rectangle(frame1, (500, 200), (600, 500), (2, 255, 2), 3)
-        # Calle
-        cv2.rectangle(frame1, (200, 230), (400, 500), (2, 255, 2), 3)
-        
-    cv2.imshow('Frame1',frame1)
-
-    cv2.namedWindow("Cropped", cv2.WINDOW_NORMAL) 
-    cv2.resizeWindow("Cropped", 200, 140)
-    cv2.imshow("Cropped", crop_img)
-
-    #cv2.waitKey(0)
-    #cv2.namedWindow("Frame2", cv2.WINDOW_NORMAL) 
-    #cv2.resizeWindow("Frame2", 650, 450) 
-    ## Display the resulting frame
-    #cv2.imshow('Frame2', frame2)
-    #result = np.abs(np.mean(crop_img) - last_mean)
-    #last_mean= np.mean(crop_img)
-#    if first_pass:
-#        first_pass = False
-#        pass
-#    else:
-
-    counter = counter + 1
-    if (counter % 30) == 0:
-        if first_pass:
-            first_pass = False
+
+
+def parse_cameras(values):
+    """Turns a list of name=url strings into a dict."""
+    cameras = {}
+    for value in values:
+        name, sep, url = value.partition("=")
+        if not sep:
+            raise argparse.ArgumentTypeError(f"Camera must be name=url, got {value}")
+        cameras[name] = url
+    return cameras
+
+
+def draw(state, frame1):
+    """Draws the zones and the motion message on the frame."""
+    for zone in state.zones:
+        roi = zone.roi
+        motion = state.moving[zone.name]
+        zone_color = (2, 2, 255) if motion else (2, 255, 2)
+        if zone.polygon is not None:
+            cv2.polylines(frame1, [np.array(zone.polygon, dtype=np.int32)], True, zone_color, 3)
         else:
-            result = np.abs(np.mean(crop_img) - last_mean)
-            last_mean = np.mean(crop_img)
-        #if result > 0.6:
-        print(f"Counter {counter} and {result}")
-    # Press q to exit
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-if counter >= 1000:
-    counter = 0
-# When everything done, release the capture
-cap1.release()
-#cap2.release()
-cv2.destroyAllWindows()
+            cv2.rectangle(frame1, (roi.x0, roi.y0), (roi.x1, roi.y1), zone_color, 3)
+        if motion:
+            frame1 = cv2.putText(frame1, f'{zone.name}: Motion Detected!!', (roi.x0, roi.y0 - 10),
+                       font, fontScale, color, thickness, cv2.LINE_AA)
+    return frame1
+
+
+def display_copy(displays, name, frame1):
+    """The frames are shared with the recorder and the workers, so we draw on
+    a copy, kept in one buffer per camera."""
+    display = displays.get(name)
+    if display is None or display.shape != frame1.shape:
+        display = displays[name] = np.empty_like(frame1)
+    np.copyto(display, frame1)
+    return display
+
+
+def show(displays, state, frame1, metrics):
+    """Draws the zones on a copy of the frame and shows it, timing both."""
+    start = time.perf_counter()
+    display = draw(state, display_copy(displays, state.name, frame1))
+    drawn = time.perf_counter()
+    cv2.imshow(f"Frame-{state.name}", display)
+    metrics.observe(state.name, "draw", drawn - start)
+    metrics.observe(state.name, "display", time.perf_counter() - drawn)
+
+
+def preview(displays, mosaic, state, frame1, metrics):
+    """Shows the frame in its window, or hands it to the mosaic."""
+    if mosaic is not None:
+        mosaic.put(state.name, frame1)
+    else:
+        show(displays, state, frame1, metrics)
+
+
+def latest_frame(engine, name):
+    """Newest frame a camera of the engine decoded, None if there is none."""
+    entries = engine.cameras[name].buffer.since(0)
+    return entries[-1][2] if entries else None
+
+
+def publish_events(bus, store, debouncer, state, frame1):
+    """Publishes a MotionEvent with a snapshot for each zone that starts
+    moving to the bus and the snapshot store (either can be None)."""
+    frame_copy = None
+    for zone in state.zones:
+        score = state.results[zone.name]
+        if not state.moving[zone.name] or not debouncer.check((state.name, zone.name)):
+            continue
+        snapshot = None
+        if frame1 is not None:
+            roi = zone.roi
+            height, width = frame1.shape[:2]
+            if state.main_size is not None and state.main_size != (width, height):
+                # Only the substream is open, the zones are in main stream pixels
+                roi = roi.scaled(width / state.main_size[0], height / state.main_size[1])
+            roi = roi.clipped(width, height)
+            if roi.x1 > roi.x0 and roi.y1 > roi.y0:
+                snapshot = frame1[roi.y0:roi.y1, roi.x0:roi.x1].copy()
+            if store is not None and frame_copy is None:
+                # The frame may be a slot of the frame pool, it gets reused
+                frame_copy = frame1.copy()
+        event = MotionEvent(state.name, zone.name, score, snapshot, frame=frame_copy)
+        if bus is not None:
+            bus.publish(event)
+        if store is not None:
+            store.put(event)
+
+
+def print_events(segmenter, state):
+    for event in segmenter.update(time.time(), state.results, state.moving):
+        print(f"Event {event.describe()}")
+
+
+def setup_windows(names):
+    """Creates the windows once, not on every frame."""
+    for name in names:
+        cv2.namedWindow(f"Frame-{name}", cv2.WINDOW_NORMAL)
+        cv2.resizeWindow(f"Frame-{name}", 650, 450)
+        cv2.namedWindow(f"Cropped-{name}", cv2.WINDOW_NORMAL)
+        cv2.resizeWindow(f"Cropped-{name}", 200, 140)
+
+
+def frame_counts(engine, pool=None):
+    """Returns {camera: (decoded, analyzed, dropped)}."""
+    counts = engine.stats()
+    if pool is not None:
+        # The engine only counts what the display took
+        for name, (decoded, analyzed, dropped) in counts.items():
+            counts[name] = (decoded, pool.analyzed[name], decoded - pool.analyzed[name])
+    return counts
+
+
+def gauges(engine, pool=None):
+    """The frame counters and health of the cameras for /metrics."""
+    lines = ["# TYPE ringring_frames_total counter"]
+    for name, counts in frame_counts(engine, pool).items():
+        for kind, count in zip(("decoded", "analyzed", "dropped"), counts):
+            lines.append(f'ringring_frames_total{{camera="{name}",kind="{kind}"}} {count}')
+    health = engine.health()
+    lines.append("# TYPE ringring_camera_up gauge")
+    for name, (uptime, reconnects, age) in health.items():
+        lines.append(f'ringring_camera_up{{camera="{name}"}} {int(uptime is not None)}')
+    lines.append("# TYPE ringring_reconnects_total counter")
+    for name, (uptime, reconnects, age) in health.items():
+        lines.append(f'ringring_reconnects_total{{camera="{name}"}} {reconnects}')
+    return lines
+
+
+def print_stats(engine, states, metrics, pool=None, segmenters=None):
+    for name, (decoded, analyzed, dropped) in frame_counts(engine, pool).items():
+        state = states[name]
+        print(f"{name} decoded {decoded} analyzed {analyzed} dropped {dropped}"
+              f" latency {state.latency * 1000:.1f}ms max {state.latency_max * 1000:.1f}ms")
+        uptime, reconnects, age = engine.cameras[name].health()
+        print(f"{name} {'down' if uptime is None else f'up {uptime:.0f}s'}"
+              f" reconnects {reconnects}"
+              f" last frame {'never' if age is None else f'{age:.1f}s ago'}")
+        grab, retrieve = engine.cameras[name].decode_cost()
+        print(f"{name} decode grab {grab:.2f}ms retrieve {retrieve:.2f}ms per frame")
+        misses = engine.cameras[name].pool_misses
+        if misses:
+            print(f"{name} frame pool was full {misses} times, raise --slots")
+        summary = metrics.summary(name)
+        if summary is not None:
+            print(summary)
+        if segmenters:
+            counts = segmenters[name].events_per_hour()
+            print(f"{name} events this hour "
+                  + (" ".join(f"{zone} {count}" for zone, count in sorted(counts.items()))
+                     or "none"))
+    summary = metrics.summary("mosaic")
+    if summary is not None:
+        print(summary)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Motion detection on RTSP cameras")
+    parser.add_argument("--camera", action="append", default=[], metavar="NAME=URL",
+                        help="camera to watch, can be repeated, the url can also be a video"
+                             " file or synthetic://, see replay.py (default: the --zones file"
+                             " or CAMERAS)")
+    parser.add_argument("--zones", metavar="FILE",
+                        help="json file with the zones of every camera, see zones.example.json")
+    parser.add_argument("--buffer", type=int, default=1,
+                        help="frames kept per camera, the newest wins (default: 1)")
+    parser.add_argument("--reader", choices=("latest", "all"), default="latest",
+                        help="latest: analyze only the newest frame and drop the stale ones,"
+                             " all: analyze every buffered frame (default: latest)")
+    parser.add_argument("--stats-every", type=float, default=30,
+                        help="seconds between decoded/analyzed/dropped reports (default: 30)")
+    parser.add_argument("--headless", action="store_true",
+                        help="no windows, no drawing, only the motion scoring (stop with Ctrl-C)")
+    parser.add_argument("--mosaic", action="store_true",
+                        help="one preview window with a small tile per camera instead of two"
+                             " windows per camera, with --substream the tiles come from the"
+                             " substream")
+    parser.add_argument("--preview-fps", type=float, default=10,
+                        help="times per second the mosaic is redrawn (default: 10)")
+    parser.add_argument("--tile", type=parse_size, default=(480, 270), metavar="WxH",
+                        help="size of each camera in the mosaic (default: 480x270)")
+    parser.add_argument("--downscale", type=int, default=2,
+                        help="shrink the area by this factor before scoring (default: 2)")
+    parser.add_argument("--detector", choices=DETECTORS, default="diff",
+                        help="how motion is scored, see detectors.py, the zones file can set"
+                             " it per camera (default: diff)")
+    parser.add_argument("--threshold", choices=("adaptive", "fixed"), default="adaptive",
+                        help="adaptive: the cutoff of each zone follows its noise and its"
+                             " threshold is the lowest it goes, fixed: the zone threshold is"
+                             " the cutoff (default: adaptive)")
+    parser.add_argument("--substream", action="store_true",
+                        help="analyze the low resolution substream (subtype=1), the main"
+                             " stream is only used for display")
+    parser.add_argument("--main-size", type=parse_size, default=(1920, 1080), metavar="WxH",
+                        help="resolution of the main stream, to scale the zones to the"
+                             " substream, the zones file can set it per camera (default: 1920x1080)")
+    parser.add_argument("--record", metavar="DIR",
+                        help="save a clip of the main stream into DIR on every motion event")
+    parser.add_argument("--pre-roll", type=float, default=3,
+                        help="seconds recorded before the motion (default: 3)")
+    parser.add_argument("--post-roll", type=float, default=5,
+                        help="seconds recorded after the last motion (default: 5)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="analysis processes, 0 analyzes in this process, the zones file"
+                             " can pin a camera to a worker (default: 0)")
+    parser.add_argument("--slots", type=int,
+                        help="frames of the preallocated shared frame pool of each camera, 0"
+                             " allocates every frame (default: 8, plus the pre-roll when recording)")
+    parser.add_argument("--stall", type=float, default=15,
+                        help="seconds without frames before a camera is reconnected (default: 15)")
+    parser.add_argument("--telegram-chat", metavar="CHAT_ID",
+                        help="send motion alerts with a snapshot to this Telegram chat, the bot"
+                             " token comes from TELEGRAM_BOT_TOKEN")
+    parser.add_argument("--alert-quiet", type=float, default=30,
+                        help="seconds a zone must be still before it alerts again (default: 30)")
+    parser.add_argument("--scores", metavar="DIR",
+                        help="save the score of every zone of every analyzed frame into DIR,"
+                             " a file per day, camera and zone, see scorelog.py and motioncam1.py")
+    parser.add_argument("--segments", action="store_true",
+                        help="print every burst of motion of a zone when it ends, with its"
+                             " duration, peak and area, and the events per hour in the stats,"
+                             " see segments.py")
+    parser.add_argument("--segment-gap", type=float, default=2, metavar="SECONDS",
+                        help="still seconds that end an event, shorter pauses are part of it"
+                             " (default: 2)")
+    parser.add_argument("--snapshots", metavar="DIR",
+                        help="save a JPEG of the frame and of the zone of every motion event"
+                             " into DIR, indexed in DIR/snapshots.db, see snapshots.py")
+    parser.add_argument("--decode-every", type=int, default=1, metavar="N",
+                        help="only retrieve every Nth frame of the analyzed stream, the rest are"
+                             " grabbed and skipped (default: 1)")
+    parser.add_argument("--ffmpeg-options", metavar="OPTIONS",
+                        help="FFmpeg capture options as key;value|key;value (default:"
+                             " OPENCV_FFMPEG_CAPTURE_OPTIONS or capture.DEFAULT_FFMPEG_OPTIONS)")
+    parser.add_argument("--capture-buffer", type=int, metavar="FRAMES",
+                        help="frames OpenCV may queue inside each capture, if the backend allows it")
+    parser.add_argument("--realtime", action="store_true",
+                        help="replay video files and synthetic:// cameras at their own pace"
+                             " instead of as fast as possible")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="serve the stage timings and frame counters at"
+                             " http://127.0.0.1:PORT/metrics, Prometheus style")
+    args = parser.parse_args()
+    if args.slots is None:
+        args.slots = 8 + (int(args.pre_roll * 30) if args.record else 0)
+    if args.workers and not args.slots:
+        parser.error("--workers needs the frame pool, --slots can't be 0")
+    if args.decode_every > 1 and args.record and not args.substream:
+        parser.error("--decode-every would skip frames of the recordings, use it with --substream")
+    set_ffmpeg_options(args.ffmpeg_options)
+
+    config = load_zones(args.zones) if args.zones else {}
+    if args.camera:
+        cameras = parse_cameras(args.camera)
+    elif config:
+        cameras = {name: camera["url"] for name, camera in config.items() if camera["url"]}
+    else:
+        cameras = CAMERAS
+    states = {}
+    for name in cameras:
+        camera = config.get(name, {})
+        main_size = None
+        if args.substream:
+            main_size = camera.get("size") or args.main_size
+        states[name] = CameraState(name, camera.get("zones", DEFAULT_ZONES), args.downscale,
+                                   main_size, camera.get("detector") or args.detector,
+                                   args.threshold == "adaptive")
+    pool = None
+    if args.workers > 0:
+        mapping = {name: config[name]["worker"] for name in cameras
+                   if config.get(name, {}).get("worker") is not None}
+        pool = AnalysisPool(states, args.workers, mapping)
+        pool.start()
+
+    bus = None
+    if args.telegram_chat:
+        from telegram import Bot
+        bot = Bot(os.environ["TELEGRAM_BOT_TOKEN"])
+        bus = EventBus(TelegramNotifier(bot, args.telegram_chat))
+        bus.start()
+    scores = None
+    if args.scores:
+        scores = ScoreLogger(args.scores)
+        scores.start()
+    segmenters = {}
+    if args.segments:
+        segmenters = {name: Segmenter(name, args.segment_gap) for name in states}
+    store = None
+    if args.snapshots:
+        store = SnapshotStore(args.snapshots)
+        store.start()
+    debouncer = Debouncer(args.alert_quiet)
+
+    # Open the RTSP streams, one capture thread per camera
+    metrics = Metrics()
+    main = None
+    if args.substream:
+        engine = CaptureEngine({name: substream_url(url) for name, url in cameras.items()},
+                               args.buffer, args.reader, args.slots, args.stall,
+                               args.decode_every, args.capture_buffer, args.realtime, metrics)
+        # The mosaic tiles are small enough for the substream
+        if (not args.headless and not args.mosaic) or args.record:
+            main = CaptureEngine(cameras, slots=args.slots, stall_seconds=args.stall,
+                                 capture_buffer=args.capture_buffer, realtime=args.realtime)
+    else:
+        engine = CaptureEngine(cameras, args.buffer, args.reader, args.slots, args.stall,
+                               args.decode_every, args.capture_buffer, args.realtime, metrics)
+    recorders = {}
+    if args.record:
+        # The clips are always made from the main stream
+        recording = main if main is not None else engine
+        for name, camera in recording.cameras.items():
+            recorders[name] = EventRecorder(name, args.record, args.pre_roll, args.post_roll)
+            camera.listeners.append(recorders[name].add)
+    if pool is not None:
+        for name, camera in engine.cameras.items():
+            camera.listeners.append(pool.listener(name, camera))
+    if main is not None:
+        main.start()
+    engine.start()
+    server = None
+    if args.metrics_port is not None:
+        server = MetricsServer(metrics, args.metrics_port, gauges=lambda: gauges(engine, pool))
+        server.start()
+    displays = {}
+    next_stats = time.monotonic() + args.stats_every
+    mosaic = None
+    if not args.headless and args.mosaic:
+        mosaic = Mosaic(cameras, args.tile, preview_fps=args.preview_fps)
+        mosaic.setup_window()
+    elif not args.headless:
+        setup_windows(cameras)
+
+    try:
+        while engine.alive():
+            if pool is not None:
+                # The workers do the scoring, we only act on the results
+                for name, seq, decoded_at, results, timings in pool.results(
+                        0.01 if not args.headless else 1):
+                    states[name].update(results, decoded_at)
+                    metrics.observe_all(name, timings)
+                    if scores is not None:
+                        scores.put(name, time.time(), results)
+                    if segmenters:
+                        print_events(segmenters[name], states[name])
+                    if recorders and states[name].motion():
+                        recorders[name].trigger()
+                    if (bus is not None or store is not None) and states[name].motion():
+                        publish_events(bus, store, debouncer, states[name],
+                                       latest_frame(main if main is not None else engine, name))
+                if (main is None or mosaic is not None) and not args.headless:
+                    for name, frame1, decoded_at in engine.wait(timeout=0):
+                        preview(displays, mosaic, states[name], frame1, metrics)
+            for name, frame1, decoded_at in engine.wait() if pool is None else ():
+                crop_img = analyze(states[name], frame1, decoded_at)
+                metrics.observe_all(name, states[name].timings)
+                if scores is not None:
+                    scores.put(name, time.time(), states[name].results)
+                if segmenters:
+                    print_events(segmenters[name], states[name])
+                if recorders and states[name].motion():
+                    recorders[name].trigger()
+                if (bus is not None or store is not None) and states[name].motion():
+                    publish_events(bus, store, debouncer, states[name],
+                                   frame1 if main is None else latest_frame(main, name))
+                if args.headless:
+                    continue
+                if main is None or mosaic is not None:
+                    preview(displays, mosaic, states[name], frame1, metrics)
+                if mosaic is None:
+                    cv2.imshow(f"Cropped-{name}", crop_img)
+            if main is not None and not args.headless and mosaic is None:
+                # Display the main stream with whatever the substream found
+                for name, frame1, decoded_at in main.wait(timeout=0):
+                    show(displays, states[name], frame1, metrics)
+            if mosaic is not None:
+                start = time.perf_counter()
+                if mosaic.render(states):
+                    metrics.observe("mosaic", "display", time.perf_counter() - start)
+
+            if time.monotonic() >= next_stats:
+                print_stats(engine, states, metrics, pool, segmenters)
+                next_stats += args.stats_every
+            # Press q to exit
+            if not args.headless and cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for segmenter in segmenters.values():
+            for event in segmenter.flush():
+                print(f"Event {event.describe()}")
+        print_stats(engine, states, metrics, pool, segmenters)
+        # When everything done, release the captures
+        if server is not None:
+            server.stop()
+        engine.stop()
+        if main is not None:
+            main.stop()
+        if pool is not None:
+            pool.stop()
+        for recorder in recorders.values():
+            recorder.close()
+        if bus is not None:
+            bus.stop()
+        if scores is not None:
+            scores.close()
+            print(f"Scores written {scores.written} dropped {scores.dropped}")
+        if store is not None:
+            store.close()
+            print(f"Snapshots saved {store.saved} duplicates {store.duplicates}"
+                  f" dropped {store.dropped}")
+        if not args.headless:
+            cv2.destroyAllWindows()
+
+
+if __name__ == '__main__':
+    main()
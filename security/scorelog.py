@@ -0,0 +1,230 @@
+# Motion scores of ringring.py saved as they come (--scores DIR), to study
+# them later with motioncam1.py instead of copying the "Counter" lines.
+# Every camera gets a folder per day with one column file per field:
+#   DIR/YYYY-MM-DD/camera/time.u32     milliseconds since that day's midnight
+#   DIR/YYYY-MM-DD/camera/ZONE.f32     score of the zone, NaN if it had none
+# Row i of every column is frame i, so a column is a flat little endian array
+# that np.memmap opens without reading it: a week of scores is a few page
+# faults until somebody looks at the numbers, and a time range is a binary
+# search on the time column.  The columns are append-only, a writer thread
+# takes the scores from a queue and appends them in batches every
+# flush_seconds, so the analysis loop never waits for the disk, and starts
+# new folders when the day changes (local time).
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+TIME_COLUMN = "time.u32"
+TIME_DTYPE = np.dtype("<u4")
+SCORE_SUFFIX = ".f32"
+SCORE_DTYPE = np.dtype("<f4")
+
+
+def day_of(timestamp):
+    return datetime.fromtimestamp(timestamp).date()
+
+
+def day_start(day):
+    """Unix time of the local midnight that starts day."""
+    return datetime(day.year, day.month, day.day).timestamp()
+
+
+def camera_folder(directory, day, camera):
+    return os.path.join(directory, day.isoformat(), camera)
+
+
+class DayColumns:
+    """The open column files of one camera on one day."""
+
+    def __init__(self, folder, day):
+        self.folder = folder
+        self.start = day_start(day)
+        os.makedirs(folder, exist_ok=True)
+        self.time = open(os.path.join(folder, TIME_COLUMN), "ab")
+        self.rows = self.time.tell() // TIME_DTYPE.itemsize
+        # A writer killed in the middle of a value would shift all that follow
+        self.time.truncate(self.rows * TIME_DTYPE.itemsize)
+        self.zones = {}
+        for name in os.listdir(folder):
+            if name.endswith(SCORE_SUFFIX):
+                self.column(name[:-len(SCORE_SUFFIX)])
+
+    def column(self, zone):
+        """The file of zone, as long as the time column."""
+        f = self.zones.get(zone)
+        if f is None:
+            f = self.zones[zone] = open(os.path.join(self.folder, zone + SCORE_SUFFIX), "ab")
+            rows = f.tell() // SCORE_DTYPE.itemsize
+            if rows > self.rows:
+                f.truncate(self.rows * SCORE_DTYPE.itemsize)
+            elif rows < self.rows:
+                # A zone added in the middle of the day, it had no scores
+                np.full(self.rows - rows, np.nan, dtype=SCORE_DTYPE).tofile(f)
+        return f
+
+    def append(self, rows):
+        """rows is a list of (unix time, {zone: score})."""
+        times = np.array([at for at, results in rows])
+        zones = {zone for at, results in rows for zone in results}
+        for zone in zones:
+            self.column(zone)
+        for zone, f in self.zones.items():
+            np.array([results.get(zone, np.nan) for at, results in rows],
+                     dtype=SCORE_DTYPE).tofile(f)
+            f.flush()
+        # Time last, a reader never sees a row whose scores are not there
+        np.round((times - self.start) * 1000).astype(TIME_DTYPE).tofile(self.time)
+        self.time.flush()
+        self.rows += len(rows)
+
+    def close(self):
+        self.time.close()
+        for f in self.zones.values():
+            f.close()
+
+
+class ScoreLogger(threading.Thread):
+    """Appends the scores it gets with put() to the columns of the day."""
+
+    def __init__(self, directory, flush_seconds=2, max_queue=10000):
+        super().__init__(name="score-log", daemon=True)
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.queue = queue.Queue(max_queue)
+        # Open columns by (day, camera), only the days being written
+        self.columns = {}
+        self.written = 0
+        self.dropped = 0
+
+    def put(self, camera, at, results):
+        """Never blocks.  results is {zone: score} of the frame at time.time()
+        at, it is copied."""
+        try:
+            self.queue.put_nowait((camera, at, dict(results)))
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        finished = False
+        while not finished:
+            deadline = time.monotonic() + self.flush_seconds
+            batch = {}
+            while True:
+                try:
+                    item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    finished = True
+                    break
+                camera, at, results = item
+                batch.setdefault((day_of(at), camera), []).append((at, results))
+            self.write(batch)
+        for columns in self.columns.values():
+            columns.close()
+
+    def write(self, batch):
+        for key, rows in batch.items():
+            columns = self.columns.get(key)
+            if columns is None:
+                columns = self.open(key)
+            columns.append(rows)
+            self.written += len(rows)
+
+    def open(self, key):
+        day, camera = key
+        # A new day, yesterday's columns are done
+        for old in [old for old in self.columns if old[0] != day]:
+            self.columns.pop(old).close()
+        columns = self.columns[key] = DayColumns(camera_folder(self.directory, day, camera), day)
+        return columns
+
+    def close(self, timeout=10):
+        if self.is_alive():
+            self.queue.put(None)
+            self.join(timeout)
+
+
+def days_between(start, end):
+    day = day_of(start)
+    while day <= day_of(end):
+        yield day
+        day += timedelta(days=1)
+
+
+def memmap(path, dtype, rows=None):
+    """Read only map of a column, None if it is missing or empty."""
+    if not os.path.exists(path):
+        return None
+    if rows is None:
+        rows = os.path.getsize(path) // dtype.itemsize
+    if not rows:
+        return None
+    return np.memmap(path, dtype=dtype, mode="r", shape=(rows,))
+
+
+def open_day(directory, camera, day):
+    """Returns (unix time of midnight, time column, {zone: score column}) as
+    memory maps of camera on day, or None if it has no scores.  Only the rows
+    the time column has are mapped, the writer appends it last."""
+    folder = camera_folder(directory, day, camera)
+    times = memmap(os.path.join(folder, TIME_COLUMN), TIME_DTYPE)
+    if times is None:
+        return None
+    zones = {}
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(SCORE_SUFFIX):
+            column = memmap(os.path.join(folder, name), SCORE_DTYPE, len(times))
+            if column is not None:
+                zones[name[:-len(SCORE_SUFFIX)]] = column
+    return day_start(day), times, zones
+
+
+def iter_days(directory, camera, start, end):
+    """Yields (day, first row, last row, mapped day) for every day of camera
+    with scores between the unix times start and end.  Nothing is read but
+    the pages the binary searches touch."""
+    for day in days_between(start, end):
+        mapped = open_day(directory, camera, day)
+        if mapped is None:
+            continue
+        midnight, times, zones = mapped
+        bounds = np.clip(np.ceil((np.array([start, end]) - midnight) * 1000), 0, 2 ** 32 - 1)
+        first, last = np.searchsorted(times, bounds.astype(TIME_DTYPE))
+        if last > first:
+            yield day, first, last, mapped
+
+
+def load_scores(directory, camera, start, end, zones=None):
+    """Returns (unix times, {zone: scores}) of camera between the unix times
+    start and end, only the rows in the range are read.  zones defaults to
+    all of them, NaN where a zone has no score for a frame."""
+    parts = []
+    for day, first, last, (midnight, times, columns) in iter_days(directory, camera, start, end):
+        parts.append((midnight + times[first:last] / 1000, first, last, columns))
+    names = zones if zones is not None else sorted({zone for *_, columns in parts
+                                                     for zone in columns})
+    if not parts:
+        return np.empty(0), {zone: np.empty(0, dtype=SCORE_DTYPE) for zone in names}
+    at = np.concatenate([part[0] for part in parts])
+    scores = {}
+    for zone in names:
+        scores[zone] = np.concatenate([
+            np.asarray(columns[zone][first:last]) if zone in columns
+            else np.full(last - first, np.nan, dtype=SCORE_DTYPE)
+            for _, first, last, columns in parts])
+    return at, scores
+
+
+def parse_time(value):
+    """YYYY-MM-DD or YYYY-MM-DD HH:MM[:SS] local time, to unix time."""
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            pass
+    raise ValueError(f"Can't read the time {value!r}")
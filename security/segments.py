@@ -0,0 +1,235 @@
+# Motion events out of the scores of a zone: "how many people passed the
+# door per hour" without looking at plots.
+# An event is a run of frames in motion (score over the threshold) and ends
+# when the zone was still for more than `gap` seconds, so someone stopping
+# for a second at the door is one event, not three.  Every event has
+#   start, end  - times of its first and last frame in motion
+#   peak        - the highest score, and peak_at its time
+#   area        - the scores integrated over time (score x seconds) from
+#                 start to end, a long small movement and a short big one
+#                 can have the same peak but not the same area
+#   frames      - frames from start to end
+# and its duration is end - start (0 for a single frame spike).
+#
+# Segmenter does it a frame at a time inside ringring.py (--segments) and
+# segment() over a whole array at once for the score histories of
+# scorelog.py, both in one pass and with the same results.
+import time
+from datetime import datetime
+
+import numpy as np
+
+from scorelog import iter_days
+
+HOUR = 3600
+
+
+class Event:
+    """A burst of motion of a zone of a camera."""
+
+    def __init__(self, camera, zone, start, end, peak, peak_at, area, frames):
+        self.camera = camera
+        self.zone = zone
+        self.start = start
+        self.end = end
+        self.peak = peak
+        self.peak_at = peak_at
+        self.area = area
+        self.frames = frames
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def __repr__(self):
+        return (f"Event({self.camera!r}, {self.zone!r}, {self.start:.3f}, {self.duration:.1f}s,"
+                f" peak {self.peak:.2f})")
+
+    def describe(self):
+        return (f"{datetime.fromtimestamp(self.start):%Y-%m-%d %H:%M:%S} {self.camera} {self.zone}"
+                f" {self.duration:5.1f}s peak {self.peak:.2f} area {self.area:.2f}"
+                f" frames {self.frames}")
+
+
+class ZoneSegmenter:
+    """The event in progress of one zone, fed a frame at a time."""
+
+    def __init__(self, camera, zone, gap=2.0, min_duration=0.0):
+        self.camera = camera
+        self.zone = zone
+        self.gap = gap
+        self.min_duration = min_duration
+        self.event = None
+        self.last_at = None
+        # Still frames after the end of the event, they are part of it if it
+        # moves again within gap
+        self.still_area = 0.0
+        self.still_frames = 0
+        self.still_peak = None
+
+    def update(self, at, score, moving):
+        """Returns the Event that ended before this frame, or None."""
+        score = 0.0 if score != score else float(score)
+        dt = 0.0 if self.last_at is None else at - self.last_at
+        self.last_at = at
+        finished = None
+        if self.event is not None and at - self.event.end > self.gap:
+            finished = self.close()
+        if moving:
+            event = self.event
+            if event is None:
+                self.event = Event(self.camera, self.zone, at, at, score, at, 0.0, 1)
+            else:
+                event.area += self.still_area + score * dt
+                event.frames += self.still_frames + 1
+                if self.still_peak is not None and self.still_peak[0] > event.peak:
+                    event.peak, event.peak_at = self.still_peak
+                if score > event.peak:
+                    event.peak, event.peak_at = score, at
+                event.end = at
+                self.still_area, self.still_frames, self.still_peak = 0.0, 0, None
+        elif self.event is not None:
+            self.still_area += score * dt
+            self.still_frames += 1
+            if self.still_peak is None or score > self.still_peak[0]:
+                self.still_peak = (score, at)
+        return finished
+
+    def close(self):
+        """Ends the event in progress, returns it unless it is too short."""
+        event = self.event
+        self.event = None
+        self.still_area, self.still_frames, self.still_peak = 0.0, 0, None
+        if event is None or event.duration < self.min_duration:
+            return None
+        return event
+
+
+class Segmenter:
+    """Events of the zones of a camera as its frames are analyzed, and how
+    many started in each of the last keep_hours hours."""
+
+    def __init__(self, camera, gap=2.0, min_duration=0.0, keep_hours=48):
+        self.camera = camera
+        self.gap = gap
+        self.min_duration = min_duration
+        self.keep_hours = keep_hours
+        self.zones = {}
+        # {hour start: {zone: events}}
+        self.hourly = {}
+
+    def update(self, at, results, moving):
+        """results and moving are the {zone: score} and {zone: in motion} of
+        the frame at unix time at.  Returns the events that ended."""
+        finished = []
+        for zone, score in results.items():
+            segmenter = self.zones.get(zone)
+            if segmenter is None:
+                segmenter = self.zones[zone] = ZoneSegmenter(self.camera, zone, self.gap,
+                                                             self.min_duration)
+            event = segmenter.update(at, score, moving.get(zone, False))
+            if event is not None:
+                finished.append(event)
+        self.count(finished)
+        return finished
+
+    def flush(self):
+        """Ends the events in progress, when the camera stops."""
+        finished = [event for event in (s.close() for s in self.zones.values()) if event]
+        self.count(finished)
+        return finished
+
+    def count(self, events):
+        for event in events:
+            hour = int(event.start // HOUR) * HOUR
+            zones = self.hourly.setdefault(hour, {})
+            zones[event.zone] = zones.get(event.zone, 0) + 1
+        if len(self.hourly) > self.keep_hours:
+            for hour in sorted(self.hourly)[:-self.keep_hours]:
+                del self.hourly[hour]
+
+    def events_per_hour(self, now=None, hours=1):
+        """{zone: events} that started in the last `hours` whole hours, the
+        current one included."""
+        now = time.time() if now is None else now
+        first = (int(now // HOUR) - hours + 1) * HOUR
+        totals = {}
+        for hour, zones in self.hourly.items():
+            if hour >= first:
+                for zone, count in zones.items():
+                    totals[zone] = totals.get(zone, 0) + count
+        return totals
+
+
+def segment(times, scores, threshold, gap=2.0, min_duration=0.0, camera=None, zone=None):
+    """Events of one zone over arrays of unix times (increasing) and scores,
+    the same that Segmenter finds a frame at a time with moving being
+    score > threshold.  NaN scores are still frames."""
+    times = np.asarray(times, dtype=np.float64)
+    values = np.nan_to_num(np.asarray(scores, dtype=np.float64))
+    over = np.flatnonzero(values > threshold)
+    if not len(over):
+        return []
+    breaks = np.flatnonzero(np.diff(times[over]) > gap)
+    firsts = over[np.concatenate(([0], breaks + 1))]
+    lasts = over[np.concatenate((breaks, [len(over) - 1]))]
+    # area from first to last is cumulative[last] - cumulative[first]
+    cumulative = np.zeros(len(values))
+    np.cumsum(values[1:] * np.diff(times), out=cumulative[1:])
+    areas = cumulative[lasts] - cumulative[firsts]
+    events = []
+    for first, last, area in zip(firsts, lasts, areas):
+        if times[last] - times[first] < min_duration:
+            continue
+        peak = first + int(np.argmax(values[first:last + 1]))
+        events.append(Event(camera, zone, float(times[first]), float(times[last]),
+                            float(values[peak]), float(times[peak]), float(area),
+                            int(last - first + 1)))
+    return events
+
+
+def segment_history(directory, camera, start, end, threshold, gap=2.0, min_duration=0.0,
+                    zones=None):
+    """Events of the zones of camera between the unix times start and end in
+    the score columns of directory.  {zone: [Event]}, read a day at a time
+    (an event going on at midnight is carried into the next day)."""
+    found = {}
+    # {zone: (times, scores)} from the start of the last event of the day
+    # before, it may go on
+    carry = {}
+    for day, first, last, (midnight, times, columns) in iter_days(directory, camera, start, end):
+        at = midnight + times[first:last] / 1000
+        names = zones if zones is not None else list(columns)
+        for name in names:
+            column = columns.get(name)
+            scores = (np.asarray(column[first:last]) if column is not None
+                      else np.full(last - first, np.nan, dtype=np.float32))
+            if name in carry:
+                carried_at, carried_scores = carry.pop(name)
+                zone_at = np.concatenate((carried_at, at))
+                scores = np.concatenate((carried_scores, scores))
+            else:
+                zone_at = at
+            events = segment(zone_at, scores, threshold, gap, 0.0, camera, name)
+            # The last event may go on in the next day, try it again there
+            if events and zone_at[-1] - events[-1].end <= gap:
+                begin = np.searchsorted(zone_at, events[-1].start)
+                carry[name] = (zone_at[begin:], scores[begin:])
+                events.pop()
+            found.setdefault(name, []).extend(
+                event for event in events if event.duration >= min_duration)
+    for name, (zone_at, scores) in carry.items():
+        found[name].extend(segment(zone_at, scores, threshold, gap, min_duration, camera, name))
+    return found
+
+
+def hourly_rates(events, start, end):
+    """Events started per hour between the unix times start and end, as
+    (hour starts, counts) arrays with every hour, the empty ones too."""
+    first = int(start // HOUR)
+    hours = np.arange(first, int(np.ceil(end / HOUR))) * HOUR
+    counts = np.zeros(len(hours), dtype=np.int64)
+    starts = np.array([event.start for event in events], dtype=np.float64)
+    starts = starts[(starts >= start) & (starts < end)]
+    np.add.at(counts, (starts // HOUR).astype(np.int64) - first, 1)
+    return hours, counts
@@ -0,0 +1,182 @@
+# Snapshots of the motion events of ringring.py (--snapshots DIR)
+# Every event (see events.py, the same ones that go to Telegram) is saved as
+# a JPEG of the whole frame and one of the zone, in DIR/YYYY-MM-DD/camera/,
+# and indexed in DIR/snapshots.db (SQLite) by camera, zone and time, so a
+# day of events can be browsed without opening any video:
+#
+#   python snapshots.py DIR --day 2024-05-01 --camera cam1
+#
+# The encoding and the database run in a writer thread, the analysis loop only
+# puts the event on a queue.  Someone standing in front of the door makes an
+# event every time the debouncer lets one through, all alike: a snapshot
+# whose zone looks like the last one saved of that zone (their difference
+# hashes are less than `distance` bits apart) is not saved again.
+import argparse
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    camera TEXT NOT NULL,
+    zone TEXT NOT NULL,
+    at REAL NOT NULL,
+    score REAL NOT NULL,
+    frame TEXT,
+    crop TEXT,
+    hash INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_at ON snapshots (at);
+CREATE INDEX IF NOT EXISTS snapshots_camera_at ON snapshots (camera, at);
+"""
+
+
+def difference_hash(image):
+    """64 bit perceptual hash: the image shrunk to 9x8 gray, one bit per pair
+    of neighbours telling which one is brighter.  Survives noise and JPEG,
+    not a person moving."""
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0]) - 2 ** 63
+
+
+def hamming(a, b):
+    return bin((a ^ b) & (2 ** 64 - 1)).count("1")
+
+
+def database_path(directory):
+    return os.path.join(directory, "snapshots.db")
+
+
+class SnapshotStore(threading.Thread):
+    """Writes the snapshots of the MotionEvents it gets with put()."""
+
+    def __init__(self, directory, distance=6, quality=85, max_queue=100):
+        super().__init__(name="snapshots", daemon=True)
+        self.directory = directory
+        self.distance = distance
+        self.quality = quality
+        self.queue = queue.Queue(max_queue)
+        # Hash of the last snapshot saved of every (camera, zone)
+        self.last_hash = {}
+        self.saved = 0
+        self.duplicates = 0
+        self.dropped = 0
+
+    def put(self, event):
+        """Never blocks, the event needs its snapshot (the zone) and frame."""
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        os.makedirs(self.directory, exist_ok=True)
+        # SQLite connections belong to the thread that made them
+        db = sqlite3.connect(database_path(self.directory))
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript(SCHEMA)
+        finished = False
+        while not finished:
+            events = [self.queue.get()]
+            while True:
+                try:
+                    events.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = []
+            for event in events:
+                if event is None:
+                    finished = True
+                    continue
+                row = self.save(event)
+                if row is not None:
+                    rows.append(row)
+            # One transaction for everything that came together
+            if rows:
+                with db:
+                    db.executemany("INSERT INTO snapshots (camera, zone, at, score, frame, crop, hash)"
+                                   " VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        db.close()
+
+    def save(self, event):
+        """Writes the JPEGs of an event, returns its row or None if it was a
+        duplicate."""
+        if event.snapshot is None:
+            return None
+        key = (event.camera, event.zone)
+        image_hash = difference_hash(event.snapshot)
+        last = self.last_hash.get(key)
+        if last is not None and hamming(image_hash, last) < self.distance:
+            self.duplicates += 1
+            return None
+        self.last_hash[key] = image_hash
+        when = datetime.fromtimestamp(event.at)
+        folder = os.path.join(self.directory, f"{when:%Y-%m-%d}", event.camera)
+        os.makedirs(folder, exist_ok=True)
+        stem = os.path.join(folder, f"{when:%H%M%S}-{when.microsecond // 1000:03}-{event.zone}")
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        crop = stem + "-zone.jpg"
+        cv2.imwrite(crop, event.snapshot, params)
+        frame = None
+        if event.frame is not None:
+            frame = stem + ".jpg"
+            cv2.imwrite(frame, event.frame, params)
+        self.saved += 1
+        return (event.camera, event.zone, event.at, float(event.score),
+                os.path.relpath(frame, self.directory) if frame else None,
+                os.path.relpath(crop, self.directory), image_hash)
+
+    def close(self, timeout=10):
+        if self.is_alive():
+            self.queue.put(None)
+            self.join(timeout)
+
+
+def find_snapshots(directory, start, end, camera=None, zone=None):
+    """Returns the rows (camera, zone, at, score, frame, crop) of the
+    snapshots between the timestamps start and end, oldest first.  The paths
+    are relative to directory."""
+    query = "SELECT camera, zone, at, score, frame, crop FROM snapshots WHERE at >= ? AND at < ?"
+    params = [start, end]
+    if camera is not None:
+        query += " AND camera = ?"
+        params.append(camera)
+    if zone is not None:
+        query += " AND zone = ?"
+        params.append(zone)
+    db = sqlite3.connect(database_path(directory))
+    try:
+        return db.execute(query + " ORDER BY at", params).fetchall()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List the motion snapshots of a day")
+    parser.add_argument("directory", help="the --snapshots directory of ringring.py")
+    parser.add_argument("--day", default=f"{datetime.now():%Y-%m-%d}",
+                        help="YYYY-MM-DD (default: today)")
+    parser.add_argument("--camera")
+    parser.add_argument("--zone")
+    args = parser.parse_args()
+
+    start = time.mktime(datetime.strptime(args.day, "%Y-%m-%d").timetuple())
+    rows = find_snapshots(args.directory, start, start + 24 * 3600, args.camera, args.zone)
+    for camera, zone, at, score, frame, crop in rows:
+        print(f"{datetime.fromtimestamp(at):%H:%M:%S} {camera} {zone} {score:6.2f}"
+              f" {os.path.join(args.directory, frame or crop)}")
+    print(f"{len(rows)} snapshots")
+
+
+if __name__ == '__main__':
+    main()
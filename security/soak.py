@@ -0,0 +1,143 @@
+# Soak test of ringring.py: runs the capture and analysis pipeline on
+# synthetic cameras (replay.py) as fast as they decode, for hours, and watches
+# whether it slowly degrades.  Every --every seconds it prints
+#   - frames/second and the mean/p99 ms of the analysis of a frame
+#   - the resident memory (RSS) of the process
+#   - the memory blocks Python has allocated (sys.getallocatedblocks), a leak
+#     of Python objects shows up here before it shows up in the RSS
+#   - the garbage collections per second, a collection runs every few hundred
+#     container objects created, so it is the allocation rate of the loop
+# and at the end the growth per hour of all of them, fitted over the run
+# without the first interval (warm-up, the pools and models filling up).
+# With --tracemalloc it also lists the lines of code whose memory grew the
+# most since the warm-up (slower, tracing every allocation costs).
+#
+#   python soak.py --hours 4 --cameras 4 --detector mog2
+import argparse
+import gc
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from analysis import DEFAULT_ZONES, CameraState, analyze
+from capture import CaptureEngine
+from detectors import DETECTORS
+from events import Debouncer
+from metrics import Histogram
+from ringring import display_copy, draw
+
+
+def rss_bytes():
+    """Resident memory right now, the peak where /proc is missing."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def collections():
+    return sum(stats["collections"] for stats in gc.get_stats())
+
+
+def growth(hours, values):
+    """Least squares slope of values per hour."""
+    if len(hours) < 2:
+        return 0.0
+    return float(np.polyfit(hours, values, 1)[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory and time drift of the pipeline over hours")
+    parser.add_argument("--hours", type=float, default=1)
+    parser.add_argument("--every", type=float, default=60, help="seconds between reports (default: 60)")
+    parser.add_argument("--cameras", type=int, default=2)
+    parser.add_argument("--detector", choices=DETECTORS, default="diff")
+    parser.add_argument("--source", default="synthetic://?seconds=1000000000&period=20",
+                        help="url of every camera (default: an endless synthetic video)")
+    parser.add_argument("--slots", type=int, default=8)
+    parser.add_argument("--downscale", type=int, default=2)
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="show where the memory that grew was allocated")
+    args = parser.parse_args()
+    if args.tracemalloc:
+        tracemalloc.start(5)
+
+    cameras = {f"soak{index}": args.source for index in range(args.cameras)}
+    states = {name: CameraState(name, DEFAULT_ZONES, args.downscale, detector=args.detector,
+                                report_every=0)
+              for name in cameras}
+    engine = CaptureEngine(cameras, slots=args.slots)
+    debouncer = Debouncer()
+    displays = {}
+    engine.start()
+
+    start = time.monotonic()
+    end = start + args.hours * 3600
+    next_report = start + args.every
+    window = Histogram()
+    frames = 0
+    last_collections = collections()
+    # Preallocated, so the soak test itself doesn't grow while it measures
+    samples = np.zeros((int(args.hours * 3600 / args.every) + 2, 5))
+    reports = 0
+    baseline = None
+    print(f"{'minutes':>8} {'fps':>7} {'iter ms':>8} {'p99':>7} {'rss MB':>8} {'blocks':>9} {'gc/s':>6}")
+    try:
+        while engine.alive() and time.monotonic() < end:
+            for name, frame1, decoded_at in engine.wait():
+                began = time.perf_counter()
+                state = states[name]
+                analyze(state, frame1, decoded_at)
+                draw(state, display_copy(displays, name, frame1))
+                for zone in state.zones:
+                    if state.moving[zone.name]:
+                        debouncer.check((name, zone.name))
+                window.observe(time.perf_counter() - began)
+                frames += 1
+            now = time.monotonic()
+            if now < next_report:
+                continue
+            elapsed = now - next_report + args.every
+            gcs = collections()
+            sample = ((now - start) / 3600, window.mean() * 1000, rss_bytes() / 2 ** 20,
+                      sys.getallocatedblocks(), (gcs - last_collections) / elapsed)
+            samples[min(reports, len(samples) - 1)] = sample
+            reports += 1
+            if args.tracemalloc and reports == 1:
+                baseline = tracemalloc.take_snapshot()
+            print(f"{(now - start) / 60:8.1f} {frames / elapsed:7.1f} {sample[1]:8.3f}"
+                  f" {window.quantile(0.99) * 1000:7.3f} {sample[2]:8.1f} {sample[3]:9}"
+                  f" {sample[4]:6.1f}")
+            window = Histogram()
+            frames = 0
+            last_collections = gcs
+            next_report = now + args.every
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop()
+
+    # The first interval is the warm-up
+    samples = samples[1:min(reports, len(samples))]
+    if len(samples) < 2:
+        print("Too short to tell, run at least three --every intervals")
+        return
+    hours, iteration, rss, blocks, gc_rate = samples.T
+    drift = growth(hours, iteration)
+    print(f"per hour: rss {growth(hours, rss):+.2f} MB, blocks {growth(hours, blocks):+.0f},"
+          f" iteration {drift:+.4f} ms ({drift / (np.mean(iteration) or 1) * 100:+.2f}%),"
+          f" gc/s {growth(hours, gc_rate):+.2f}")
+    if baseline is not None:
+        print("Grew the most since the warm-up:")
+        for stat in tracemalloc.take_snapshot().compare_to(baseline, "lineno")[:10]:
+            print(f"  {stat}")
+
+
+if __name__ == '__main__':
+    main()
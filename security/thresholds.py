@@ -0,0 +1,151 @@
+# Motion thresholds that follow the noise of each zone.
+# A fixed cutoff has to be set above the worst noise of the day, at dusk the
+# scores of a still scene drift up (grain, headlights, trees) and a cutoff
+# that is fine at noon starts to alarm.  AdaptiveThreshold learns the median
+# and the median absolute deviation (MAD) of the scores of a zone as they come
+# and moves the cutoff to median + k * MAD:
+#   - both are estimated in O(1) time and memory per sample: every sample
+#     moves the estimate a step towards it, and the step is a small fraction
+#     (rate) of the MAD, so the estimates jitter by a fraction of the noise
+#     instead of by the noise itself, and follow a drift of the noise at a
+#     pace that scales with it
+#   - hysteresis: motion starts over the cutoff and only ends when the score
+#     drops under median + k_off * MAD, so a score hovering around the cutoff
+#     doesn't flap
+#   - the fixed threshold of the zone is the floor of the cutoff, a dead
+#     still zone (MAD 0) doesn't alarm on every speck of noise
+#   - the scores of the motion itself would teach it that motion is normal,
+#     while a zone is in motion the estimates learn ten times slower
+#     (moving_rate), so someone at the door hardly moves them but a lasting
+#     change of the scene (a parked car, dusk) is learned in a minute or so
+#     instead of alarming forever
+#   - warm-up: the first samples, moving or not, are kept and give the exact
+#     median and MAD to start from, meanwhile the fixed threshold decides
+#
+#   python thresholds.py     checks it on simulated noise
+import argparse
+import statistics
+
+import numpy as np
+
+
+class StreamingMedian:
+    """Streaming estimate of the median, it moves a given step towards every
+    sample."""
+
+    def __init__(self, value=None):
+        self.value = value
+
+    def update(self, x, step):
+        if self.value is None:
+            self.value = x
+        elif x > self.value:
+            self.value = min(self.value + step, x)
+        elif x < self.value:
+            self.value = max(self.value - step, x)
+        return self.value
+
+
+class AdaptiveThreshold:
+    """Decides if the score of one zone is motion, call update() with every
+    score of the zone."""
+
+    def __init__(self, floor, k=5.0, k_off=2.0, warmup=250, rate=0.01, moving_rate=0.001,
+                 min_mad=1e-3):
+        self.floor = floor
+        self.k = k
+        self.k_off = k_off
+        self.warmup = warmup
+        self.rate = rate
+        self.moving_rate = moving_rate
+        # Smallest MAD the steps are made of, or a zone that was dead still
+        # would never learn anything
+        self.min_mad = min_mad
+        self.median = StreamingMedian()
+        self.mad = StreamingMedian()
+        self.samples = 0
+        # The warm-up samples, None once they gave the estimates
+        self.first = []
+        self.moving = False
+
+    def cutoff(self):
+        """The score motion starts over."""
+        if self.first is not None:
+            return self.floor
+        return max(self.median.value + self.k * self.mad.value, self.floor)
+
+    def release(self):
+        """The score motion ends under."""
+        if self.first is not None:
+            return self.floor
+        return max(self.median.value + self.k_off * self.mad.value, self.floor * self.k_off / self.k)
+
+    def update(self, score):
+        """Returns True while the zone is in motion."""
+        if self.moving:
+            self.moving = score >= self.release()
+        else:
+            self.moving = score > self.cutoff()
+        self.samples += 1
+        if self.first is not None:
+            self.first.append(score)
+            if len(self.first) >= self.warmup:
+                median = statistics.median(self.first)
+                self.median.value = median
+                self.mad.value = statistics.median(abs(x - median) for x in self.first)
+                self.first = None
+            return self.moving
+        rate = self.moving_rate if self.moving else self.rate
+        step = rate * max(self.mad.value, self.min_mad)
+        median = self.median.update(score, step)
+        self.mad.update(abs(score - median), step)
+        return self.moving
+
+
+def simulate(threshold, scores):
+    """Returns (fraction of the frames in motion, motion starts per 1000
+    frames) of threshold over scores, after the warm-up."""
+    moving = np.array([threshold.update(score) for score in scores])[threshold.warmup:]
+    starts = np.count_nonzero(moving[1:] & ~moving[:-1]) + int(moving[0])
+    return moving.mean(), starts * 1000 / len(scores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check AdaptiveThreshold on simulated noise")
+    parser.add_argument("--frames", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+    n = args.frames
+    stationary = rng.uniform(0.4, 0.8, n)
+    # Noise over the floor from the first frame
+    over_floor = rng.uniform(0.7, 1.0, n)
+    # Dusk: the noise of a still scene goes up in ten minutes at 25 fps
+    dusk = rng.uniform(0.0, 0.3, n) + np.clip((np.arange(n) - n / 4) / 15000, 0, 1) * 0.6
+    # Someone walking by for two seconds every minute
+    walking = stationary.copy()
+    for start in range(1000, n, 1500):
+        walking[start:start + 50] = rng.uniform(2.0, 3.0, 50)
+    failed = False
+    for name, floor, scores, expected in (("stationary", 0.1, stationary, (0.001, 0.1)),
+                                          ("over the floor", 0.6, over_floor, (0.001, 0.1)),
+                                          ("dusk", 0.1, dusk, (0.01, 0.5))):
+        fraction, starts = simulate(AdaptiveThreshold(floor), scores)
+        ok = fraction <= expected[0] and starts <= expected[1]
+        failed |= not ok
+        print(f"{name:15} motion {fraction:7.2%} of the frames, {starts:.2f} starts per 1000"
+              f" frames {'ok' if ok else 'TOO MANY'}")
+    threshold = AdaptiveThreshold(0.1)
+    moving = np.array([threshold.update(score) for score in walking])
+    found = sum(moving[start:start + 50].any() for start in range(1000, n, 1500))
+    walks = len(range(1000, n, 1500))
+    fraction = moving[threshold.warmup:].mean()
+    ok = found == walks and fraction < 50 / 1500 * 1.5
+    failed |= not ok
+    print(f"{'walking':15} found {found} of {walks} walks, motion {fraction:.2%} of the frames"
+          f" {'ok' if ok else 'WRONG'}")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# Analysis worker processes for ringring.py
+# With many cameras one Python thread can't score them all, so the capture
+# threads (still in the main process) decode every frame into shared memory
+# (framepool.py) and only send a tiny (camera, slot, seq) message to the
+# worker process of that camera.  The worker scores the newest frame of each
+# of its cameras and sends the zone scores back on a results queue.
+#
+# Cameras are spread round robin over the workers, "worker": N in the zones
+# file pins a camera to worker N.
+import multiprocessing
+import queue
+from multiprocessing import resource_tracker
+
+from analysis import analyze
+from framepool import SharedFrames
+
+
+def worker_main(frames_queue, results_queue, states):
+    """Entry point of an analysis process, states is {camera: CameraState}."""
+    shared = {}
+    while True:
+        messages = [frames_queue.get()]
+        # Take everything that is waiting, only the newest frame of each
+        # camera gets analyzed
+        while True:
+            try:
+                messages.append(frames_queue.get_nowait())
+            except queue.Empty:
+                break
+        newest = {}
+        for message in messages:
+            if message is None:
+                for frames in shared.values():
+                    frames.close()
+                return
+            if message[0] == "attach":
+                _, camera, spec = message
+                if camera in shared:
+                    shared[camera].close()
+                shared[camera] = SharedFrames.attach(spec)
+                newest.pop(camera, None)
+            else:
+                newest[message[1]] = message
+        for _, camera, slot, seq, decoded_at in newest.values():
+            frames = shared[camera]
+            if not frames.valid(slot, seq):
+                continue
+            state = states[camera]
+            # Only the area of the zones is copied out of the slot, if the
+            # slot was overwritten meanwhile the torn frame is dropped before
+            # the detector and the thresholds learn from it
+            if analyze(state, frames.views[slot], decoded_at,
+                       lambda: frames.valid(slot, seq)) is None:
+                continue
+            results_queue.put((camera, seq, decoded_at, dict(state.results), state.timings))
+
+
+class AnalysisPool:
+    """Starts the worker processes and feeds them the frames of the cameras."""
+
+    def __init__(self, states, workers, mapping=None):
+        mapping = mapping or {}
+        self.assign = {}
+        for index, camera in enumerate(states):
+            self.assign[camera] = mapping.get(camera, index) % workers
+        self.queues = [multiprocessing.Queue() for _ in range(workers)]
+        self.results_queue = multiprocessing.Queue()
+        self.processes = []
+        for worker, frames_queue in enumerate(self.queues):
+            assigned = {camera: state for camera, state in states.items()
+                        if self.assign[camera] == worker}
+            self.processes.append(multiprocessing.Process(
+                target=worker_main, args=(frames_queue, self.results_queue, assigned),
+                name=f"analysis-{worker}", daemon=True))
+        self.analyzed = {camera: 0 for camera in states}
+
+    def start(self):
+        """Start the workers before the capture threads, forking a process
+        with threads running is asking for trouble."""
+        # The workers must share our resource tracker, with their own one it
+        # unlinks the shared memory they attached to when they exit
+        resource_tracker.ensure_running()
+        for process in self.processes:
+            process.start()
+
+    def listener(self, name, camera):
+        """Returns the function the capture thread of camera calls with every
+        frame, the camera must decode into a frame pool (slots > 0)."""
+        frames_queue = self.queues[self.assign[name]]
+        attached = [None]
+
+        def publish(frame, decoded_at, slot, seq):
+            if slot is None:
+                # Not in shared memory (the pool was full), the worker can't see it
+                return
+            if camera.frames is not attached[0]:
+                # First frame, or the camera changed its resolution
+                attached[0] = camera.frames
+                frames_queue.put(("attach", name, camera.frames.spec()))
+            frames_queue.put(("frame", name, slot, seq, decoded_at))
+
+        return publish
+
+    def results(self, timeout=1.0):
+        """Returns the (camera, seq, decoded_at, results, timings) that came
+        back, waits up to timeout for the first one."""
+        results = []
+        try:
+            results.append(self.results_queue.get(timeout=timeout))
+            while True:
+                results.append(self.results_queue.get_nowait())
+        except queue.Empty:
+            pass
+        for camera, *_ in results:
+            self.analyzed[camera] += 1
+        return results
+
+    def stop(self):
+        for frames_queue in self.queues:
+            frames_queue.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
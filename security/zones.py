@@ -0,0 +1,151 @@
+# Areas of the image watched by ringring.py
+# The coordinates are always written in pixels of the main stream (subtype=0),
+# when the analysis runs on the substream (subtype=1) they get scaled down.
+#
+# The zones of each camera can come from a json file like zones.example.json:
+#   {"cam1": {"url": "rtsp://...", "size": [1920, 1080],
+#             "zones": {"Timbre": {"rect": [x0, y0, x1, y1], "threshold": 0.6},
+#                       "Puerta": {"polygon": [[x, y], ...], "threshold": 1.0}}}}
+# The threshold is the cutoff of the score, or its floor with the adaptive
+# thresholds (thresholds.py).
+# "url", "size", "detector" and "worker" are optional, size is the resolution
+# of the main stream, detector one of detectors.DETECTORS and worker the
+# analysis process of the camera when running with --workers.
+import json
+
+import cv2
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.6
+
+
+class Roi:
+    """A rectangle of the frame, [y0:y1, x0:x1] in slicing terms."""
+
+    def __init__(self, x0, y0, x1, y1):
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+
+    def __repr__(self):
+        return f"Roi({self.x0}, {self.y0}, {self.x1}, {self.y1})"
+
+    def scaled(self, fx, fy):
+        """Returns the same area on a frame resized by fx, fy."""
+        return Roi(int(self.x0 * fx), int(self.y0 * fy),
+                   int(self.x1 * fx), int(self.y1 * fy))
+
+    def clipped(self, width, height):
+        """Returns the part of the area that falls inside the frame."""
+        return Roi(max(self.x0, 0), max(self.y0, 0),
+                   min(self.x1, width), min(self.y1, height))
+
+
+class Zone:
+    """A named area with its own motion threshold.  Polygons are watched
+    inside their bounding rectangle (roi) through a mask."""
+
+    def __init__(self, name, roi, threshold=DEFAULT_THRESHOLD, polygon=None):
+        self.name = name
+        self.roi = roi
+        self.threshold = threshold
+        self.polygon = polygon
+
+    def __repr__(self):
+        return f"Zone({self.name!r}, {self.roi}, {self.threshold})"
+
+
+class CompiledZones:
+    """The zones of one camera prepared for the size of its analysis frames.
+    The rectangle covering all the zones is cropped and converted to gray once
+    per frame and every zone is a precomputed slice (plus mask) into it.
+    The gray area is written into the same buffer on every frame."""
+
+    def __init__(self, zones, frame_shape, main_size=None, downscale=1):
+        height, width = frame_shape[:2]
+        fx, fy = 1, 1
+        if main_size is not None:
+            fx, fy = width / main_size[0], height / main_size[1]
+        scaled = [zone.roi.scaled(fx, fy).clipped(width, height) for zone in zones]
+        self.area = Roi(min(roi.x0 for roi in scaled), min(roi.y0 for roi in scaled),
+                        max(roi.x1 for roi in scaled), max(roi.y1 for roi in scaled))
+        self.downscale = downscale
+        self.size = ((self.area.x1 - self.area.x0) // downscale,
+                     (self.area.y1 - self.area.y0) // downscale)
+        self.small = np.empty((self.size[1], self.size[0], 3), dtype=np.uint8)
+        self.gray_area = np.empty((self.size[1], self.size[0]), dtype=np.uint8)
+        self.parts = []
+        for zone, roi in zip(zones, scaled):
+            ys = slice((roi.y0 - self.area.y0) // downscale, (roi.y1 - self.area.y0) // downscale)
+            xs = slice((roi.x0 - self.area.x0) // downscale, (roi.x1 - self.area.x0) // downscale)
+            mask = None
+            if zone.polygon is not None:
+                points = np.array([((x * fx - roi.x0) / downscale, (y * fy - roi.y0) / downscale)
+                                   for x, y in zone.polygon], dtype=np.int32)
+                mask = np.zeros((ys.stop - ys.start, xs.stop - xs.start), dtype=np.uint8)
+                cv2.fillPoly(mask, [points], 255)
+            self.parts.append((zone, ys, xs, mask))
+
+    def gray(self, frame):
+        """Crops the area of the zones from the BGR frame, shrinks it by
+        downscale and only then converts it to gray, so we never convert
+        pixels we throw away.  The result is overwritten by the next call."""
+        return self.convert(self.crop(frame))
+
+    def crop(self, frame, copy=False):
+        """The first half of gray(): the BGR area of the zones, downscaled.
+        With copy it is in our own buffer even without downscaling, not a
+        view of frame."""
+        crop = frame[self.area.y0:self.area.y1, self.area.x0:self.area.x1]
+        if self.downscale > 1:
+            crop = cv2.resize(crop, self.size, dst=self.small, interpolation=cv2.INTER_AREA)
+        elif copy:
+            np.copyto(self.small, crop)
+            crop = self.small
+        return crop
+
+    def convert(self, crop):
+        """The second half of gray()."""
+        return cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY, dst=self.gray_area)
+
+    def crops(self, gray):
+        """Yields (zone, crop, mask) for every zone, mask is None for rectangles."""
+        for zone, ys, xs, mask in self.parts:
+            yield zone, gray[ys, xs], mask
+
+
+def zone_from_config(name, config):
+    threshold = config.get("threshold", DEFAULT_THRESHOLD)
+    if "polygon" in config:
+        polygon = [tuple(point) for point in config["polygon"]]
+        xs = [x for x, y in polygon]
+        ys = [y for x, y in polygon]
+        return Zone(name, Roi(min(xs), min(ys), max(xs), max(ys)), threshold, polygon)
+    return Zone(name, Roi(*config["rect"]), threshold)
+
+
+def load_zones(path):
+    """Reads a zones file, returns
+    {camera: {"url": ..., "size": ..., "detector": ..., "worker": ..., "zones": [Zone]}}."""
+    with open(path) as f:
+        config = json.load(f)
+    cameras = {}
+    for camera, camera_config in config.items():
+        cameras[camera] = {
+            "url": camera_config.get("url"),
+            "size": tuple(camera_config["size"]) if "size" in camera_config else None,
+            "detector": camera_config.get("detector"),
+            "worker": camera_config.get("worker"),
+            "zones": [zone_from_config(name, zone_config)
+                      for name, zone_config in camera_config["zones"].items()],
+        }
+    return cameras
+
+
+def substream_url(url):
+    """Returns the low resolution substream of a Dahua style RTSP url."""
+    return url.replace("subtype=0", "subtype=1")
+
+
+def parse_size(value):
+    """Parses WIDTHxHEIGHT."""
+    width, _, height = value.lower().partition("x")
+    return int(width), int(height)